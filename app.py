@@ -1,9 +1,18 @@
 import streamlit as st
+import pandas as pd
 from pathlib import Path
 import base64
 import time
 
-from inference.predictor import predict_customer_segment
+from features.cleaning import clean_transactions, load_transactions
+from features.rfm import build_rfm
+from inference.predictor import (
+    predict_customer_segment,
+    predict_customer_segments_batch
+)
+from inference.registry import DEFAULT_VERSION, registry
+
+STATIC_DIR = Path(__file__).resolve().parent / "static"
 
 # ============================================================
 # PAGE CONFIG
@@ -64,19 +73,56 @@ def apply_theme():
 
 apply_theme()
 
+# ============================================================
+# CACHED RESOURCES
+# ============================================================
+# The models themselves are cached per server process by the registry.
+MODEL_VERSION = DEFAULT_VERSION
+
+
+@st.cache_data(max_entries=10_000)
+def cached_prediction(fingerprint, version, recency, frequency, monetary,
+                      quantity, unique_products):
+    """
+    Identical inputs are scored once per artifact version. fingerprint
+    (registry.refresh()) is part of the key, so re-exported artifacts
+    are never answered from entries scored with the old ones.
+    """
+    return predict_customer_segment({
+        "Recency": recency,
+        "Frequency": frequency,
+        "Monetary": monetary,
+        "TotalQuantity": quantity,
+        "UniqueProducts": unique_products
+    }, version)
+
+
 # ============================================================
 # BACKGROUND IMAGE
 # ============================================================
-def set_background(image_path: str, dim: float = 0.7):
-    p = Path(image_path)
+@st.cache_data
+def background_css(image_name: str, dim: float) -> str:
+    """
+    CSS for a page background, built once per (image, dim).
+
+    With static serving on (.streamlit/config.toml) the image is referenced
+    by URL and cached by the browser; otherwise it is inlined as base64,
+    but still only encoded once per server process.
+    """
+    p = STATIC_DIR / image_name
     if not p.exists():
-        return
+        return ""
+
+    if st.get_option("server.enableStaticServing"):
+        url = f"app/static/{image_name}"
+    else:
+        encoded = base64.b64encode(p.read_bytes()).decode()
+        url = f"data:image/jpeg;base64,{encoded}"
 
-    encoded = base64.b64encode(p.read_bytes()).decode()
-    st.markdown(f"""
+    return f"""
     <style>
     .stApp {{
-        background: url("data:image/jpeg;base64,{encoded}") no-repeat center center fixed;
+        background: url("{url}") no-repeat center center fixed;
         background-size: cover;
     }}
     .stApp::before {{
@@ -91,7 +137,13 @@ def set_background(image_path: str, dim: float = 0.7):
         z-index: 1;
     }}
     </style>
-    """, unsafe_allow_html=True)
+    """
+
+
+def set_background(image_name: str, dim: float = 0.7):
+    css = background_css(image_name, dim)
+    if css:
+        st.markdown(css, unsafe_allow_html=True)
 
 # ============================================================
 # NAV BAR
@@ -156,10 +208,23 @@ def home_page():
 def predict_page():
     set_background("bgc.jpg", 0.6)
     nav_bar()
+    # Reloads the models if they were re-exported since they were loaded
+    fingerprint = registry.refresh(MODEL_VERSION)
+    registry.get(MODEL_VERSION)
 
     st.markdown("<h2 style='text-align:center;'>📈 Customer Segmentation Predictor</h2>",
                 unsafe_allow_html=True)
 
+    mode = st.radio("Mode", ["Single customer", "Upload file"],
+                    horizontal=True)
+
+    if mode == "Single customer":
+        single_prediction(fingerprint)
+    else:
+        batch_prediction()
+
+
+def single_prediction(fingerprint: str):
     col1, col2 = st.columns(2)
 
     with col1:
@@ -172,20 +237,86 @@ def predict_page():
         unique_products = st.number_input("Unique Products", min_value=0)
 
     if st.button("Predict Segment"):
-        input_data = {
-            "Recency": recency,
-            "Frequency": frequency,
-            "Monetary": monetary,
-            "TotalQuantity": quantity,
-            "UniqueProducts": unique_products
-        }
-
-        result = predict_customer_segment(input_data)
+        result = cached_prediction(
+            fingerprint, MODEL_VERSION,
+            recency, frequency, monetary, quantity, unique_products
+        )
 
         st.success(f"KMeans Cluster: {result['kmeans_cluster']}")
         st.info(f"GMM Cluster: {result['gmm_cluster']}")
         st.write(f"GMM Confidence: {result['gmm_confidence']}")
 
+# ============================================================
+# BATCH UPLOAD
+# ============================================================
+UPLOAD_CHUNK_SIZE = 50_000
+
+
+def upload_to_features(uploaded, kind: str) -> pd.DataFrame:
+    """Customer feature rows from an uploaded CSV/Parquet file."""
+    is_parquet = uploaded.name.lower().endswith((".parquet", ".pq"))
+
+    if kind == "Customer features":
+        return pd.read_parquet(uploaded) if is_parquet else pd.read_csv(uploaded)
+
+    # Raw invoice lines -> cleaned -> one RFM row per customer
+    if is_parquet:
+        transactions = clean_transactions(pd.read_parquet(uploaded))
+    else:
+        transactions = load_transactions(uploaded, clean=True)
+    return build_rfm(transactions).reset_index()
+
+
+def score_with_progress(customers: pd.DataFrame) -> pd.DataFrame:
+    """Score in UPLOAD_CHUNK_SIZE vectorized chunks, updating a progress bar."""
+    n = len(customers)
+    bar = st.progress(0.0, text=f"Scoring {n:,} customers...")
+
+    parts = []
+    for start in range(0, n, UPLOAD_CHUNK_SIZE):
+        chunk = customers.iloc[start:start + UPLOAD_CHUNK_SIZE]
+        parts.append(predict_customer_segments_batch(chunk))
+        done = min(start + UPLOAD_CHUNK_SIZE, n)
+        bar.progress(done / n, text=f"Scored {done:,} / {n:,} customers")
+
+    bar.empty()
+    return customers.join(pd.concat(parts)) if parts else customers
+
+
+def batch_prediction():
+    kind = st.radio("File contains", ["Customer features", "Raw transactions"],
+                    horizontal=True)
+    uploaded = st.file_uploader("Upload CSV or Parquet",
+                                type=["csv", "parquet", "pq"])
+    if uploaded is None:
+        return
+
+    # Scored and encoded once per upload; reruns (e.g. the download
+    # click) reuse both
+    key = (uploaded.file_id, kind)
+    if st.session_state.get("upload_key") != key:
+        try:
+            with st.spinner("Reading file..."):
+                customers = upload_to_features(uploaded, kind)
+            scored = score_with_progress(customers)
+        except (ValueError, KeyError) as e:
+            st.error(f"Could not score this file: {e}")
+            return
+
+        st.session_state.upload_key = key
+        st.session_state.upload_result = scored
+        st.session_state.upload_csv = scored.to_csv(index=False).encode()
+
+    scored = st.session_state.upload_result
+    st.success(f"Scored {len(scored):,} customers")
+    st.dataframe(scored.head(100))
+    st.download_button(
+        "Download results (CSV)",
+        data=st.session_state.upload_csv,
+        file_name=f"{Path(uploaded.name).stem}_segments.csv",
+        mime="text/csv"
+    )
+
 # ============================================================
 # ROUTER
 # ============================================================
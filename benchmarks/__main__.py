@@ -0,0 +1,77 @@
+"""
+    python -m benchmarks run [--quick] [-k predict]
+    python -m benchmarks compare [--threshold 0.1] [BASELINE CURRENT]
+
+`run` appends a record to .benchmarks/history.jsonl. `compare` diffs two
+records (by index into the history, default: the last two) and exits
+with status 1 if any benchmark regressed by more than the threshold.
+"""
+import argparse
+import sys
+
+from benchmarks.suite import (
+    HISTORY_PATH,
+    append_history,
+    compare_runs,
+    load_history,
+    run_suite
+)
+
+
+def _run(args):
+    record = run_suite(quick=args.quick, only=args.k, min_time=args.min_time,
+                       log=sys.stdout)
+    append_history(record, args.history)
+    print(f"Appended run {record['timestamp']} to {args.history}")
+
+
+def _compare(args):
+    history = load_history(args.history)
+    if len(history) < 2:
+        sys.exit(f"Need at least two runs in {args.history} to compare")
+
+    baseline, current = history[args.baseline], history[args.current]
+    rows = compare_runs(baseline, current, args.threshold)
+
+    print(f"baseline {baseline['timestamp']} ({baseline['commit']})  ->  "
+          f"current {current['timestamp']} ({current['commit']})")
+    for name, before, after, change, status in rows:
+        before_ms = "-" if before is None else f"{before * 1e3:.3f}"
+        change_pct = "-" if change is None else f"{change:+.1%}"
+        print(f"{name:36} {before_ms:>12} {after * 1e3:12.3f} ms "
+              f"{change_pct:>8}  {status}")
+
+    if any(row[-1] == "regression" for row in rows):
+        sys.exit(1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    parser.add_argument("--history", default=str(HISTORY_PATH),
+                        help="JSON-lines file of benchmark runs")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Run the benchmark suite")
+    run.add_argument("--quick", action="store_true",
+                     help="Only the smallest sizes (CI-friendly)")
+    run.add_argument("-k", action="append",
+                     help="Only benchmarks whose name contains this")
+    run.add_argument("--min-time", type=float, default=0.5,
+                     help="Seconds to spend timing each benchmark")
+    run.set_defaults(func=_run)
+
+    compare = commands.add_parser("compare", help="Diff two recorded runs")
+    compare.add_argument("baseline", nargs="?", type=int, default=-2,
+                         help="History index of the baseline (default -2)")
+    compare.add_argument("current", nargs="?", type=int, default=-1,
+                         help="History index of the current run (default -1)")
+    compare.add_argument("--threshold", type=float, default=0.10,
+                         help="Relative slowdown counted as a regression")
+    compare.set_defaults(func=_compare)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Compare features.rfm against the groupby-apply implementation in
+doc/customer_pr/gptcode.py on synthetic invoice lines.
+
+    python -m benchmarks.bench_features --rows 100000 --customers 2000
+"""
+import argparse
+import importlib.util
+import time
+
+import pandas as pd
+
+from benchmarks import BASE_DIR
+from benchmarks.data import synthetic_transactions
+from features.rfm import build_behaviour_features, build_rfm
+
+GPTCODE_PATH = BASE_DIR / "doc" / "customer_pr" / "gptcode.py"
+
+
+def load_reference():
+    spec = importlib.util.spec_from_file_location("gptcode", GPTCODE_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmark features.rfm against gptcode.py."
+    )
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--customers", type=int, default=2_000)
+    parser.add_argument("--seed", type=int, default=53)
+    args = parser.parse_args(argv)
+
+    reference = load_reference()
+    df = synthetic_transactions(args.rows, args.customers, args.seed)
+
+    ref_rfm, ref_rfm_s = timed(reference.calculate_rfm, df)
+    ref_extra, ref_extra_s = timed(reference.engineer_additional_features, df)
+    rfm, rfm_s = timed(build_rfm, df)
+    extra, extra_s = timed(build_behaviour_features, df)
+
+    pd.testing.assert_frame_equal(
+        rfm[ref_rfm.columns], ref_rfm, check_dtype=False
+    )
+    extra = extra.join(rfm["UniqueProducts"])
+    pd.testing.assert_frame_equal(
+        extra[ref_extra.columns], ref_extra, check_dtype=False
+    )
+
+    print(f"{args.rows} rows, {args.customers} customers (outputs identical)")
+    print(f"{'':24}{'gptcode':>10}{'features':>10}{'speedup':>10}")
+    for name, before, after in [("RFM", ref_rfm_s, rfm_s),
+                                ("behaviour", ref_extra_s, extra_s)]:
+        print(f"{name:24}{before:>9.2f}s{after:>9.2f}s{before / after:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
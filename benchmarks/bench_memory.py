@@ -0,0 +1,89 @@
+"""
+Peak memory of loading + cleaning + RFM: gptcode.py versus
+features.cleaning / features.rfm.
+
+Each pipeline runs in a fresh spawned process and reports its peak RSS,
+so the numbers include everything pandas allocates (not only what
+tracemalloc can see).
+
+    python -m benchmarks.bench_memory --rows 1000000
+"""
+import argparse
+import multiprocessing
+import resource
+import tempfile
+from pathlib import Path
+
+from benchmarks.data import synthetic_transactions
+
+
+def _peak_rss_mb():
+    # VmHWM is reset by exec; ru_maxrss would include the parent's peak
+    status = Path("/proc/self/status")
+    if status.exists():
+        for line in status.read_text().splitlines():
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _baseline(path):
+    import pandas  # noqa: F401  (import cost is part of every pipeline)
+    return _peak_rss_mb()
+
+
+def _gptcode_pipeline(path):
+    from benchmarks.bench_features import load_reference
+
+    gptcode = load_reference()
+    df = gptcode.load_data(path)
+    df = gptcode.clean_missing_values(df)
+    df = gptcode.remove_duplicates(df)
+    gptcode.calculate_rfm(df)
+    return _peak_rss_mb()
+
+
+def _features_pipeline(path):
+    from features.cleaning import load_transactions
+    from features.rfm import build_rfm
+
+    df = load_transactions(path, clean=True)
+    build_rfm(df)
+    return _peak_rss_mb()
+
+
+def measure(pipeline, path):
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(1) as pool:
+        return pool.apply(pipeline, (str(path),))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Peak memory of the gptcode and features pipelines."
+    )
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--customers", type=int, default=4_000)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "transactions.csv"
+        synthetic_transactions(args.rows, args.customers).to_csv(
+            path, index=False
+        )
+        size_mb = path.stat().st_size / 1e6
+
+        baseline = measure(_baseline, path)
+        before = measure(_gptcode_pipeline, path)
+        after = measure(_features_pipeline, path)
+
+    print(f"{args.rows} rows, {size_mb:.0f} MB CSV "
+          f"(interpreter + pandas baseline {baseline:.0f} MB)")
+    print(f"gptcode.py peak RSS: {before:8.0f} MB")
+    print(f"features   peak RSS: {after:8.0f} MB")
+    print(f"reduction (above baseline): "
+          f"{(before - baseline) / max(after - baseline, 1):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
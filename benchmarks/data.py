@@ -0,0 +1,352 @@
+"""
+Deterministic synthetic inputs for the benchmarks.
+
+    python -m benchmarks.data transactions.parquet --rows 100000000
+
+writes Online Retail-shaped transactions (see iter_transactions) in
+chunks, for load-testing cleaning, feature building and scoring.
+"""
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from features.rfm import RFM_FEATURES
+
+
+def synthetic_customers(n_rows: int, seed: int = 53):
+    """Customer feature rows (RFM_FEATURES) with skewed, RFM-like scales."""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "Recency": rng.integers(1, 374, n_rows),
+        "Frequency": rng.geometric(0.2, n_rows),
+        "Monetary": rng.lognormal(6.5, 1.2, n_rows).round(2),
+        "TotalQuantity": rng.lognormal(5.5, 1.2, n_rows).astype(np.int64) + 1,
+        "UniqueProducts": rng.geometric(0.03, n_rows)
+    }, columns=RFM_FEATURES)
+
+
+def synthetic_transactions(n_rows: int, n_customers: int, seed: int = 53):
+    """Invoice lines shaped like the Online Retail dataset."""
+    rng = np.random.default_rng(seed)
+
+    customer = rng.integers(12000, 12000 + n_customers, n_rows)
+    invoice = customer * 1000 + rng.integers(0, 20, n_rows)
+    quantity = rng.integers(1, 50, n_rows)
+    quantity[rng.random(n_rows) < 0.02] *= -1
+    start = np.datetime64("2010-12-01T08:00")
+    minutes = rng.integers(0, 365 * 24 * 60, n_rows)
+
+    return pd.DataFrame({
+        "InvoiceNo": invoice.astype(str),
+        "StockCode": rng.integers(20000, 24000, n_rows).astype(str),
+        "Description": "ITEM",
+        "Quantity": quantity,
+        "InvoiceDate": start + minutes.astype("timedelta64[m]"),
+        "UnitPrice": rng.gamma(2.0, 2.0, n_rows).round(2),
+        "CustomerID": customer.astype(float),
+        "Country": rng.choice(["United Kingdom", "France", "Germany"], n_rows)
+    })
+
+
+# ------------------------------------------------------------
+# Online Retail-shaped transaction generator
+# ------------------------------------------------------------
+
+FIRST_INVOICE = 536365
+FIRST_CUSTOMER = 12346
+START_DATE = np.datetime64("2010-12-01")
+N_DAYS = 374
+
+# Trading hours 07:00-19:00, no Saturdays (as in the real data)
+OPEN_MINUTE = 7 * 60
+TRADING_MINUTES = 12 * 60
+
+# Share of lines per country, roughly as in the real data
+COUNTRY_WEIGHTS = {
+    "United Kingdom": 0.890,
+    "Germany": 0.023,
+    "France": 0.020,
+    "EIRE": 0.018,
+    "Spain": 0.007,
+    "Netherlands": 0.006,
+    "Belgium": 0.005,
+    "Switzerland": 0.005,
+    "Portugal": 0.004,
+    "Australia": 0.003,
+    "Norway": 0.003,
+    "Italy": 0.002,
+    "Channel Islands": 0.002,
+    "Finland": 0.002,
+    "Cyprus": 0.002,
+    "Sweden": 0.002,
+    "Unspecified": 0.001,
+    "Japan": 0.001,
+    "Poland": 0.001,
+    "Denmark": 0.001
+}
+
+NOISE_DESCRIPTIONS = {
+    "POST": "POSTAGE",
+    "D": "Discount",
+    "M": "Manual",
+    "DOT": "DOTCOM POSTAGE",
+    "BANK CHARGES": "Bank Charges"
+}
+
+TRANSACTION_COLUMNS = [
+    "InvoiceNo",
+    "StockCode",
+    "Description",
+    "Quantity",
+    "InvoiceDate",
+    "UnitPrice",
+    "CustomerID",
+    "Country"
+]
+
+
+def _power_law_cdf(n: int, exponent: float, rng):
+    """CDF over n items with Zipf-like weights, ranks shuffled across items."""
+    weights = rng.permutation(np.arange(1, n + 1) ** -exponent)
+    cdf = np.cumsum(weights)
+    return cdf / cdf[-1]
+
+
+def _sample(cdf, size: int, rng):
+    return np.minimum(np.searchsorted(cdf, rng.random(size)), len(cdf) - 1)
+
+
+def _catalog(n_products: int, rng):
+    """StockCodes, Descriptions and list prices; noise codes come last."""
+    numbers = rng.choice(np.arange(10000, 90000), n_products, replace=False)
+    suffix = np.where(rng.random(n_products) < 0.2,
+                      rng.choice(list("ABCDEFGL"), n_products), "")
+    codes = np.char.add(numbers.astype(str), suffix)
+
+    return {
+        "codes": np.concatenate([codes, list(NOISE_DESCRIPTIONS)]),
+        "descriptions": np.concatenate([
+            np.char.add("PRODUCT ", codes), list(NOISE_DESCRIPTIONS.values())
+        ]),
+        "prices": np.concatenate([
+            rng.lognormal(1.0, 0.9, n_products).round(2),
+            rng.lognormal(3.0, 1.0, len(NOISE_DESCRIPTIONS)).round(2)
+        ])
+    }
+
+
+def _trading_days():
+    days = START_DATE + np.arange(N_DAYS)
+    weekday = (days.astype("datetime64[D]").view("int64") - 4) % 7  # Mon=0
+    return days[weekday != 5]
+
+
+def iter_transactions(n_rows: int, n_customers: int = None, seed: int = 53,
+                      chunk_size: int = 1_000_000, n_products: int = 4000,
+                      lines_per_invoice: float = 20.0,
+                      activity_exponent: float = 0.7,
+                      cancel_rate: float = 0.017, guest_rate: float = 0.25,
+                      noise_rate: float = 0.005, bad_line_rate: float = 0.002):
+    """
+    Yield n_rows invoice lines shaped like the Online Retail dataset, in
+    DataFrames of at most chunk_size rows.
+
+    - invoices have a geometric number of lines (mean lines_per_invoice)
+      and share one customer, timestamp and country across their lines
+    - customer activity and product popularity follow power laws, so a
+      few customers and products account for most lines
+    - cancel_rate of invoices are cancellations ("C" prefix, negative
+      quantities), guest_rate have no CustomerID, noise_rate of lines use
+      NOISE_STOCK_CODES and bad_line_rate have no Description and a zero
+      UnitPrice
+    - InvoiceNo and InvoiceDate increase through the output, as in the
+      real file; each customer always buys from the same country
+
+    Every column is generated vectorized per chunk. The output depends
+    only on the arguments: the same seed and chunk_size reproduce the
+    same rows. Categorical columns (InvoiceNo, StockCode, Description,
+    Country) are pandas categoricals.
+    """
+    if n_customers is None:
+        n_customers = max(n_rows // 125, 10)
+
+    n_chunks = -(-n_rows // chunk_size)
+    setup_seed, *chunk_seeds = np.random.SeedSequence(seed).spawn(n_chunks + 1)
+    rng = np.random.default_rng(setup_seed)
+
+    catalog = _catalog(n_products, rng)
+    product_cdf = _power_law_cdf(n_products, 1.0, rng)
+    customer_cdf = _power_law_cdf(n_customers, activity_exponent, rng)
+
+    countries = np.array(list(COUNTRY_WEIGHTS))
+    country_cdf = np.cumsum(list(COUNTRY_WEIGHTS.values()))
+    country_cdf /= country_cdf[-1]
+    customer_country = _sample(country_cdf, n_customers, rng)
+
+    days = _trading_days()
+    total_minutes = len(days) * TRADING_MINUTES
+
+    next_invoice = FIRST_INVOICE
+    for i, chunk_seed in enumerate(chunk_seeds):
+        rng = np.random.default_rng(chunk_seed)
+        start = i * chunk_size
+        m = min(chunk_size, n_rows - start)
+
+        # Invoices: sizes summing to exactly m lines
+        sizes = rng.geometric(1 / lines_per_invoice,
+                              int(m / lines_per_invoice * 1.2) + 16)
+        while sizes.sum() < m:
+            sizes = np.concatenate([sizes, rng.geometric(1 / lines_per_invoice,
+                                                         len(sizes))])
+        ends = np.cumsum(sizes)
+        k = int(np.searchsorted(ends, m)) + 1
+        sizes = sizes[:k]
+        sizes[-1] -= ends[k - 1] - m
+        invoice = np.repeat(np.arange(k), sizes)
+
+        cancelled = rng.random(k) < cancel_rate
+        guest = rng.random(k) < guest_rate
+        customer = _sample(customer_cdf, k, rng)
+        country = np.where(guest, _sample(country_cdf, k, rng),
+                           customer_country[customer])
+
+        # This chunk's share of the year, in increasing order
+        lo = total_minutes * start // n_rows
+        hi = max(total_minutes * (start + m) // n_rows, lo + 1)
+        minutes = np.sort(rng.integers(lo, hi, k))
+        dates = (days[minutes // TRADING_MINUTES].astype("datetime64[m]")
+                 + (OPEN_MINUTE + minutes % TRADING_MINUTES))
+
+        numbers = (next_invoice + np.arange(k)).astype(str)
+        invoice_no = np.where(cancelled, np.char.add("C", numbers), numbers)
+        next_invoice += k
+
+        # Lines
+        product = _sample(product_cdf, m, rng)
+        noise = rng.random(m) < noise_rate
+        product[noise] = n_products + rng.integers(
+            0, len(NOISE_DESCRIPTIONS), noise.sum()
+        )
+
+        quantity = rng.geometric(0.15, m).astype(np.int32)
+        quantity[rng.random(m) < 0.05] *= 12
+        quantity[cancelled[invoice]] *= -1
+
+        unit_price = catalog["prices"][product]
+        description = product.copy()
+        bad = rng.random(m) < bad_line_rate
+        unit_price[bad] = 0.0
+        description[bad] = -1
+
+        customer_id = (FIRST_CUSTOMER + customer).astype(np.float64)
+        customer_id[guest] = np.nan
+
+        yield pd.DataFrame({
+            "InvoiceNo": pd.Categorical.from_codes(invoice, invoice_no),
+            "StockCode": pd.Categorical.from_codes(product, catalog["codes"]),
+            "Description": pd.Categorical.from_codes(
+                description, catalog["descriptions"]
+            ),
+            "Quantity": quantity,
+            "InvoiceDate": dates[invoice].astype("datetime64[ns]"),
+            "UnitPrice": unit_price,
+            "CustomerID": customer_id[invoice],
+            "Country": pd.Categorical.from_codes(country[invoice], countries)
+        }, index=pd.RangeIndex(start, start + m))
+
+
+def generate_transactions(n_rows: int, **kwargs):
+    """iter_transactions collected into one DataFrame."""
+    from features.cleaning import concat_transactions
+
+    return concat_transactions(list(iter_transactions(n_rows, **kwargs)))
+
+
+def _to_arrow_table(df, csv: bool, date_format: str = None):
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    if not csv:
+        return table
+
+    # Plain strings and second-resolution timestamps, so every chunk has
+    # the same schema and dates print as "2010-12-01 08:26:00"
+    columns = []
+    for column in table.columns:
+        if pa.types.is_dictionary(column.type):
+            column = column.cast(pa.string())
+        elif pa.types.is_timestamp(column.type):
+            column = column.cast(pa.timestamp("s"))
+            if date_format is not None:
+                column = pc.strftime(column, format=date_format)
+        columns.append(column)
+    return pa.table(columns, names=table.column_names)
+
+
+def write_transactions(path, n_rows: int, date_format: str = None,
+                       **kwargs) -> int:
+    """
+    Stream iter_transactions to a CSV or Parquet file (by suffix).
+
+    Memory use is bounded by one chunk. Writing goes through pyarrow,
+    which is several times faster than DataFrame.to_csv at this scale.
+    date_format (e.g. the real file's "%m/%d/%Y %H:%M") formats
+    InvoiceDate in CSV output; the default ISO format is also the
+    fastest to parse back.
+    """
+    import pyarrow.csv
+    import pyarrow.parquet
+
+    csv = Path(path).suffix.lower() not in (".parquet", ".pq")
+    writer = schema = None
+    n_written = 0
+    try:
+        for chunk in iter_transactions(n_rows, **kwargs):
+            table = _to_arrow_table(chunk, csv, date_format)
+            if writer is None:
+                schema = table.schema
+                writer = (pyarrow.csv.CSVWriter if csv
+                          else pyarrow.parquet.ParquetWriter)(path, schema)
+            else:
+                # Dictionary columns may differ in index width per chunk
+                table = table.cast(schema)
+            writer.write_table(table)
+            n_written += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    return n_written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.data",
+        description="Write synthetic Online Retail-shaped transactions."
+    )
+    parser.add_argument("out", help="Output .csv or .parquet file")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--customers", type=int, default=None,
+                        help="Distinct customers (default rows / 125)")
+    parser.add_argument("--seed", type=int, default=53)
+    parser.add_argument("--chunksize", type=int, default=1_000_000)
+    parser.add_argument("--date-format", default=None,
+                        help='e.g. "%%m/%%d/%%Y %%H:%%M" (default ISO)')
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    n_rows = write_transactions(args.out, args.rows,
+                                date_format=args.date_format,
+                                n_customers=args.customers, seed=args.seed,
+                                chunk_size=args.chunksize)
+    elapsed = time.perf_counter() - start
+    print(f"Wrote {n_rows:,} rows to {args.out} in {elapsed:.1f}s "
+          f"({n_rows / elapsed:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
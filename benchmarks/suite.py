@@ -0,0 +1,275 @@
+"""
+Performance benchmark suite.
+
+Benchmarks run on deterministic synthetic data and on artifacts fitted to
+it in a temporary directory, so results do not depend on artifacts/ or
+on the real dataset. Every run is appended to a JSON-lines history file
+that `compare` diffs to flag regressions.
+"""
+import json
+import platform
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import joblib
+import numpy as np
+
+from benchmarks import BASE_DIR
+from benchmarks.data import generate_transactions, synthetic_customers
+
+HISTORY_PATH = BASE_DIR / ".benchmarks" / "history.jsonl"
+BENCH_VERSION = "benchmark"
+
+BENCHMARKS = []
+
+
+def benchmark(name, sizes, quick_sizes=None):
+    """
+    Register fn(size, ctx) -> (callable, items) as a benchmark.
+
+    The callable is what gets timed; items is the number of rows it
+    processes per call, used to report throughput.
+    """
+    def register(fn):
+        BENCHMARKS.append({
+            "name": name,
+            "fn": fn,
+            "sizes": sizes,
+            "quick_sizes": quick_sizes or sizes[:1]
+        })
+        return fn
+    return register
+
+
+# ------------------------------------------------------------
+# Inference
+# ------------------------------------------------------------
+
+@benchmark("predict_single", sizes=[1])
+def _predict_single(size, ctx):
+    from inference.predictor import predict_customer_segment
+
+    row = synthetic_customers(1, seed=1).iloc[0].to_dict()
+    return lambda: predict_customer_segment(row, BENCH_VERSION), 1
+
+
+@benchmark("numpy_predict_single", sizes=[1])
+def _numpy_predict_single(size, ctx):
+    from inference.numpy_predictor import NumpySegmentPredictor
+    from inference.registry import registry
+
+    model = NumpySegmentPredictor.from_bundle(registry.get(BENCH_VERSION))
+    row = synthetic_customers(1, seed=1).iloc[0].to_dict()
+    return lambda: model.predict(row), 1
+
+
+@benchmark("load_artifacts_joblib", sizes=[1])
+def _load_artifacts_joblib(size, ctx):
+    from inference.registry import load_bundle
+
+    return lambda: load_bundle(ctx["artifact_dir"], flat=False), 1
+
+
+@benchmark("load_artifacts_flat", sizes=[1])
+def _load_artifacts_flat(size, ctx):
+    from inference.numpy_predictor import FLAT_DIR, NumpySegmentPredictor
+
+    path = ctx["artifact_dir"] / FLAT_DIR
+    return lambda: NumpySegmentPredictor.from_flat(path), 1
+
+
+@benchmark("predict_batch", sizes=[1_000, 100_000, 10_000_000],
+           quick_sizes=[1_000, 100_000])
+def _predict_batch(size, ctx):
+    from inference.predictor import predict_customer_segments_batch
+
+    X = synthetic_customers(size, seed=2).to_numpy(dtype=np.float64)
+    return lambda: predict_customer_segments_batch(
+        X, version=BENCH_VERSION
+    ), size
+
+
+# ------------------------------------------------------------
+# Feature engineering
+# ------------------------------------------------------------
+
+@benchmark("build_rfm", sizes=[100_000, 1_000_000, 10_000_000],
+           quick_sizes=[100_000])
+def _build_rfm(size, ctx):
+    from features.cleaning import clean_transactions
+    from features.rfm import build_rfm
+
+    df = clean_transactions(generate_transactions(size))
+    return lambda: build_rfm(df), size
+
+
+@benchmark("clean_transactions", sizes=[100_000, 1_000_000, 10_000_000],
+           quick_sizes=[100_000])
+def _clean_transactions(size, ctx):
+    from features.cleaning import clean_transactions
+
+    df = generate_transactions(size)
+    return lambda: clean_transactions(df), size
+
+
+# ------------------------------------------------------------
+# Training
+# ------------------------------------------------------------
+
+@benchmark("kmeans_fit", sizes=[10_000, 100_000], quick_sizes=[10_000])
+def _kmeans_fit(size, ctx):
+    from sklearn.cluster import KMeans
+
+    X = ctx["scaler"].transform(synthetic_customers(size, seed=3))
+    return lambda: KMeans(n_clusters=4, random_state=53).fit(X), size
+
+
+@benchmark("gmm_fit", sizes=[10_000, 100_000], quick_sizes=[10_000])
+def _gmm_fit(size, ctx):
+    from sklearn.mixture import GaussianMixture
+
+    X = ctx["scaler"].transform(synthetic_customers(size, seed=3))
+    return lambda: GaussianMixture(n_components=4, random_state=53).fit(X), \
+        size
+
+
+# ------------------------------------------------------------
+# Runner
+# ------------------------------------------------------------
+
+def fit_benchmark_artifacts(out_dir, n_rows: int = 20_000):
+    """Fit scaler/KMeans/GMM on synthetic customers and save them."""
+    from sklearn.cluster import KMeans
+    from sklearn.mixture import GaussianMixture
+    from sklearn.preprocessing import StandardScaler
+
+    from inference.numpy_predictor import export_flat_artifacts
+
+    customers = synthetic_customers(n_rows)
+    scaler = StandardScaler().fit(customers)
+    X_scaled = scaler.transform(customers)
+
+    out_dir = Path(out_dir)
+    joblib.dump(scaler, out_dir / "scaler.pkl")
+    joblib.dump(KMeans(n_clusters=4, random_state=53).fit(X_scaled),
+                out_dir / "kmeans.pkl")
+    joblib.dump(GaussianMixture(n_components=4, random_state=53).fit(X_scaled),
+                out_dir / "gmm.pkl")
+    with open(out_dir / "feature_schema.json", "w") as f:
+        json.dump({"features": list(customers.columns)}, f, indent=4)
+    export_flat_artifacts(out_dir)
+
+    return scaler
+
+
+def time_callable(fn, min_time: float = 0.5, max_rounds: int = 1000):
+    """Call fn repeatedly (at least once) and return per-call timings."""
+    fn()  # warm-up: imports, caches, lazy loading
+    timings = []
+    total = 0.0
+    while total < min_time and len(timings) < max_rounds:
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        timings.append(elapsed)
+        total += elapsed
+    return np.array(timings)
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(quick: bool = False, only=None, min_time: float = 0.5,
+              log=None) -> dict:
+    """Run the (selected) benchmarks and return one history record."""
+    from inference.registry import registry
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        ctx = {"scaler": fit_benchmark_artifacts(tmp),
+               "artifact_dir": Path(tmp)}
+        registry.register(BENCH_VERSION, tmp)
+
+        for bench in BENCHMARKS:
+            if only and not any(pattern in bench["name"] for pattern in only):
+                continue
+            for size in bench["quick_sizes"] if quick else bench["sizes"]:
+                fn, items = bench["fn"](size, ctx)
+                timings = time_callable(fn, min_time)
+                median = float(np.median(timings))
+
+                key = f"{bench['name']}[{size}]"
+                results[key] = {
+                    "median_s": median,
+                    "min_s": float(timings.min()),
+                    "rounds": len(timings),
+                    "items_per_s": items / median
+                }
+                if log is not None:
+                    print(f"{key:36} {median * 1e3:12.3f} ms "
+                          f"{items / median:14,.0f} rows/s", file=log)
+
+        registry.unload(BENCH_VERSION)
+
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "machine": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "processor": platform.processor() or platform.machine()
+        },
+        "quick": quick,
+        "results": results
+    }
+
+
+def append_history(record, path=HISTORY_PATH):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a") as f:
+        f.write(json.dumps(record) + "\n")
+
+
+def load_history(path=HISTORY_PATH):
+    path = Path(path)
+    if not path.exists():
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def compare_runs(baseline, current, threshold: float = 0.10):
+    """
+    Per-benchmark change in median time between two history records.
+
+    Returns a list of rows (name, baseline_s, current_s, change, status)
+    where status is "regression" when current is more than threshold
+    slower, "improvement" when more than threshold faster.
+    """
+    rows = []
+    for name, result in current["results"].items():
+        before = baseline["results"].get(name)
+        if before is None:
+            rows.append((name, None, result["median_s"], None, "new"))
+            continue
+
+        change = result["median_s"] / before["median_s"] - 1
+        status = "ok"
+        if change > threshold:
+            status = "regression"
+        elif change < -threshold:
+            status = "improvement"
+        rows.append((name, before["median_s"], result["median_s"], change,
+                     status))
+    return rows
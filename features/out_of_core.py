@@ -0,0 +1,135 @@
+"""
+Out-of-core customer feature building.
+
+Transactions are hash-partitioned on CustomerID, so every customer's
+lines land in exactly one partition. Each partition is cleaned and
+aggregated on its own and the per-customer results are concatenated;
+only the largest partition ever has to fit in memory.
+
+Input is either a hash-partitioned Parquet dataset (one sub-directory or
+file per partition) or a CSV, which is first streamed in chunks into such
+a dataset.
+"""
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+
+from features.cleaning import clean_transactions
+from features.rfm import aggregate_rfm, build_behaviour_features, finalize_rfm
+from inference.metrics import timed
+
+TRANSACTION_COLUMNS = [
+    "InvoiceNo",
+    "StockCode",
+    "Quantity",
+    "InvoiceDate",
+    "UnitPrice",
+    "CustomerID",
+    "Country"
+]
+
+# Fixed dtypes so every chunk (and so every Parquet file) has one schema
+CSV_DTYPES = {
+    "InvoiceNo": str,
+    "StockCode": str,
+    "Country": str,
+    "CustomerID": "float64",
+    "UnitPrice": "float64"
+}
+
+
+def partition_of(customer_ids, n_partitions: int):
+    """Stable hash partition number for each CustomerID."""
+    return pd.util.hash_array(customer_ids.to_numpy()) % n_partitions
+
+
+@timed("features.partition_transactions")
+def partition_transactions(csv_path, out_dir, n_partitions: int = 64,
+                           chunksize: int = 1_000_000,
+                           encoding: str = "ISO-8859-1"):
+    """
+    Stream a transaction CSV into a hash-partitioned Parquet dataset.
+
+    Rows are cleaned per chunk on the way, so only usable lines are
+    written. Layout: out_dir/part=NNN/chunk-NNNNNN.parquet.
+
+    out_dir must not exist or be empty: files left by an earlier run
+    would be read back as part of the dataset and double-count customers.
+    """
+    out_dir = Path(out_dir)
+    if out_dir.exists() and any(out_dir.iterdir()):
+        raise FileExistsError(
+            f"{out_dir} is not empty; partition into a new directory"
+        )
+
+    reader = pd.read_csv(
+        csv_path,
+        usecols=TRANSACTION_COLUMNS,
+        dtype=CSV_DTYPES,
+        parse_dates=["InvoiceDate"],
+        chunksize=chunksize,
+        encoding=encoding
+    )
+    for i, chunk in enumerate(reader):
+        chunk = clean_transactions(chunk)
+        parts = partition_of(chunk["CustomerID"], n_partitions)
+
+        for part, rows in chunk.groupby(parts):
+            part_dir = out_dir / f"part={part:03d}"
+            part_dir.mkdir(parents=True, exist_ok=True)
+            rows.to_parquet(part_dir / f"chunk-{i:06d}.parquet", index=False)
+
+    return out_dir
+
+
+def iter_partitions(dataset_dir):
+    """Yield each partition of a partitioned Parquet dataset as a DataFrame."""
+    for part in sorted(Path(dataset_dir).iterdir()):
+        if part.is_dir() or part.suffix == ".parquet":
+            yield pd.read_parquet(part, columns=TRANSACTION_COLUMNS)
+
+
+@timed("features.aggregate_partition", rows=True)
+def aggregate_partition(df, behaviour: bool = False):
+    """Per-customer aggregates of one partition (all lines of its customers)."""
+    df = clean_transactions(df)
+    aggregates = aggregate_rfm(df)
+    if behaviour:
+        aggregates = aggregates.join(build_behaviour_features(df))
+    return aggregates
+
+
+def build_features_out_of_core(source, snapshot_date=None,
+                               behaviour: bool = False,
+                               n_partitions: int = 64,
+                               chunksize: int = 1_000_000,
+                               workdir=None):
+    """
+    Customer features from a transaction log that does not fit in memory.
+
+    source is a CSV file or a directory holding a Parquet dataset that is
+    already hash-partitioned on CustomerID. CSV input is partitioned into
+    workdir (a temporary directory by default) first. Returns the same
+    frame as build_rfm (joined with build_behaviour_features when
+    behaviour=True) over the cleaned transactions.
+    """
+    source = Path(source)
+
+    if source.is_dir():
+        return _build_from_partitions(source, snapshot_date, behaviour)
+
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        dataset = partition_transactions(source, tmp, n_partitions, chunksize)
+        return _build_from_partitions(dataset, snapshot_date, behaviour)
+
+
+def _build_from_partitions(dataset_dir, snapshot_date, behaviour):
+    aggregates = pd.concat([
+        aggregate_partition(part, behaviour)
+        for part in iter_partitions(dataset_dir)
+    ]).sort_index()
+
+    # Recency needs the global last invoice date, known only after all
+    # partitions have been aggregated
+    return finalize_rfm(aggregates, snapshot_date)
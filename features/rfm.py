@@ -0,0 +1,171 @@
+"""
+Customer-level feature engineering from invoice lines.
+
+Vectorized replacement for calculate_rfm / engineer_additional_features in
+doc/customer_pr/gptcode.py: every feature is a built-in grouped
+aggregation over the whole frame instead of a Python function per
+customer, and the input frame is never copied.
+"""
+import pandas as pd
+
+from inference.metrics import timed
+
+RFM_FEATURES = [
+    "Recency",
+    "Frequency",
+    "Monetary",
+    "TotalQuantity",
+    "UniqueProducts"
+]
+
+BEHAVIOUR_FEATURES = [
+    "VarietyIndex",
+    "AvgBasketSize",
+    "AvgOrderValue",
+    "PriceMean",
+    "PriceStd",
+    "ReturnRate",
+    "ActiveDays",
+    "ActiveMonths",
+    "MeanInterpurchaseTime",
+    "WeekendPurchaseRatio",
+    "MorningPurchaseRatio",
+    "NumCountries"
+]
+
+
+def default_snapshot_date(invoice_dates):
+    """One day after the last invoice, as in the notebook."""
+    return invoice_dates.max() + pd.Timedelta(days=1)
+
+
+def _invoice_dates(df):
+    dates = df["InvoiceDate"]
+    if not pd.api.types.is_datetime64_any_dtype(dates):
+        dates = pd.to_datetime(dates)
+    return dates
+
+
+def _amount(df):
+    # float64 even when UnitPrice is stored as float32 (see load_transactions)
+    price = df["UnitPrice"].to_numpy(dtype="float64")
+    return df["Quantity"].to_numpy(dtype="float64") * price
+
+
+@timed("features.aggregate_rfm", rows=True)
+def aggregate_rfm(df):
+    """
+    Snapshot-independent RFM aggregates per CustomerID: LastInvoiceDate,
+    Frequency, Monetary, TotalQuantity and UniqueProducts.
+
+    df holds cleaned invoice lines with CustomerID, InvoiceNo, StockCode,
+    Quantity, UnitPrice and InvoiceDate.
+    """
+    lines = pd.DataFrame({
+        "CustomerID": df["CustomerID"].array,
+        "InvoiceNo": df["InvoiceNo"].array,
+        "StockCode": df["StockCode"].array,
+        "Quantity": df["Quantity"].array,
+        "Amount": _amount(df),
+        "InvoiceDate": _invoice_dates(df).to_numpy()
+    })
+
+    return lines.groupby("CustomerID", observed=True).agg(
+        LastInvoiceDate=("InvoiceDate", "max"),
+        Frequency=("InvoiceNo", "nunique"),
+        Monetary=("Amount", "sum"),
+        TotalQuantity=("Quantity", "sum"),
+        UniqueProducts=("StockCode", "nunique")
+    )
+
+
+@timed("features.finalize_rfm", rows=True)
+def finalize_rfm(aggregates, snapshot_date=None):
+    """Turn aggregate_rfm output into RFM features as of snapshot_date."""
+    if snapshot_date is None:
+        snapshot_date = default_snapshot_date(aggregates["LastInvoiceDate"])
+
+    rfm = aggregates.drop(columns="LastInvoiceDate")
+    recency = (snapshot_date - aggregates["LastInvoiceDate"]).dt.days
+    rfm.insert(0, "Recency", recency)
+
+    return rfm
+
+
+def build_rfm(df, snapshot_date=None):
+    """
+    Recency, Frequency, Monetary, TotalQuantity and UniqueProducts per
+    CustomerID (the model's training features).
+
+    snapshot_date defaults to one day after the last invoice in df.
+    """
+    return finalize_rfm(aggregate_rfm(df), snapshot_date)
+
+
+@timed("features.build_behaviour_features", rows=True)
+def build_behaviour_features(df):
+    """
+    Purchasing-pattern, temporal and geographic features per CustomerID
+    (the extra features of gptcode.engineer_additional_features).
+    """
+    dates = _invoice_dates(df)
+    hours = dates.dt.hour
+    quantity = df["Quantity"]
+
+    lines = pd.DataFrame({
+        "CustomerID": df["CustomerID"].array,
+        "InvoiceNo": df["InvoiceNo"].array,
+        "StockCode": df["StockCode"].array,
+        "Country": df["Country"].array,
+        "Quantity": quantity.array,
+        "UnitPrice": df["UnitPrice"].to_numpy(dtype="float64"),
+        "Amount": _amount(df),
+        "InvoiceDate": dates.to_numpy(),
+        "Month": (dates.dt.year * 12 + dates.dt.month).to_numpy(),
+        "IsReturn": (quantity < 0).to_numpy(),
+        "IsWeekend": (dates.dt.weekday >= 5).to_numpy(),
+        "IsMorning": ((hours >= 6) & (hours < 12)).to_numpy()
+    })
+
+    # Gap to the customer's previous line, in file order like Series.diff
+    gaps = lines.groupby("CustomerID", observed=True)["InvoiceDate"].diff()
+    lines["Gap"] = gaps.dt.days
+
+    grouped = lines.groupby("CustomerID", observed=True)
+    agg = grouped.agg(
+        UniqueProducts=("StockCode", "nunique"),
+        TotalQuantity=("Quantity", "sum"),
+        Invoices=("InvoiceNo", "nunique"),
+        Amount=("Amount", "sum"),
+        PriceMean=("UnitPrice", "mean"),
+        PriceStd=("UnitPrice", "std"),
+        ReturnRate=("IsReturn", "mean"),
+        FirstInvoiceDate=("InvoiceDate", "min"),
+        LastInvoiceDate=("InvoiceDate", "max"),
+        ActiveMonths=("Month", "nunique"),
+        MeanInterpurchaseTime=("Gap", "mean"),
+        WeekendPurchaseRatio=("IsWeekend", "mean"),
+        MorningPurchaseRatio=("IsMorning", "mean"),
+        NumCountries=("Country", "nunique")
+    )
+
+    basket_size = (
+        lines.groupby(["CustomerID", "InvoiceNo"], observed=True)["Quantity"]
+        .sum()
+        .groupby(level="CustomerID").mean()
+    )
+
+    agg["VarietyIndex"] = agg["UniqueProducts"] / agg["TotalQuantity"]
+    agg["AvgBasketSize"] = basket_size
+    agg["AvgOrderValue"] = agg["Amount"] / agg["Invoices"]
+    agg["ActiveDays"] = (
+        agg["LastInvoiceDate"] - agg["FirstInvoiceDate"]
+    ).dt.days
+
+    return agg[BEHAVIOUR_FEATURES]
+
+
+def build_customer_features(df, snapshot_date=None):
+    """RFM plus behavioural features, one row per customer."""
+    rfm = build_rfm(df, snapshot_date)
+    return rfm.join(build_behaviour_features(df), how="left")
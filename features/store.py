@@ -0,0 +1,273 @@
+"""
+Incremental per-customer feature store.
+
+Holds running aggregates (last invoice date, invoice count, monetary and
+quantity sums, distinct products) and folds new transaction batches into
+them, touching only the customers present in the batch. Recency is
+derived at read time from a snapshot date, so a daily refresh costs
+O(new transactions) rather than a rebuild over the full history.
+
+Distinct products are tracked as (customer, product) pairs encoded as
+int64 keys, and the store is saved column-wise as Parquet files in a
+directory, so neither an update nor a save/load goes through Python
+objects per pair.
+
+Neither the pairs nor the rows of newly seen customers are merged into
+one array/frame on every update. Each update appends a sorted run (or a
+block of new customers) and runs of similar size are merged (see
+_compact), so there are O(log n) runs and every entry is copied O(log n)
+times over the store's life. The runs are merged fully when .table or
+.pairs is read, e.g. by features() and save().
+
+Assumes each invoice arrives in a single batch; invoices are counted per
+batch, not de-duplicated across batches.
+"""
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from features.rfm import RFM_FEATURES, default_snapshot_date
+
+AGGREGATE_COLUMNS = [
+    "LastInvoiceDate",
+    "InvoiceCount",
+    "MonetarySum",
+    "QuantitySum",
+    "UniqueProducts"
+]
+SUM_COLUMNS = ["InvoiceCount", "MonetarySum", "QuantitySum", "UniqueProducts"]
+# Running sums are widened so they cannot overflow the batch's dtype
+AGGREGATE_DTYPES = {
+    "InvoiceCount": "int64",
+    "MonetarySum": "float64",
+    "QuantitySum": "int64",
+    "UniqueProducts": "int64"
+}
+
+
+def _encode_pairs(customers, products):
+    """(customer, product id) pairs as single int64 keys, customer first."""
+    return (customers.astype(np.int64) << 32) | products.astype(np.int64)
+
+
+def _compact(runs, merge):
+    """
+    Merge trailing runs until each is more than twice the size of the
+    next, keeping O(log n) runs and O(log n) copies per entry.
+    """
+    while len(runs) > 1 and len(runs[-2]) <= 2 * len(runs[-1]):
+        last = runs.pop()
+        runs[-1] = merge(runs[-1], last)
+
+
+def _merge_pairs(a, b):
+    # A stable sort of two sorted runs is a linear merge
+    return np.sort(np.concatenate([a, b]), kind="stable")
+
+
+def _merge_tables(a, b):
+    return pd.concat([a, b])
+
+
+def _empty_table():
+    return pd.DataFrame({
+        "LastInvoiceDate": pd.Series(dtype="datetime64[ns]"),
+        "InvoiceCount": pd.Series(dtype="int64"),
+        "MonetarySum": pd.Series(dtype="float64"),
+        "QuantitySum": pd.Series(dtype="int64"),
+        "UniqueProducts": pd.Series(dtype="int64")
+    }, index=pd.Index([], name="CustomerID"))
+
+
+class FeatureStore:
+    """
+    Running RFM aggregates keyed by CustomerID.
+
+        store = FeatureStore.load("rfm_store/")
+        store.update(todays_clean_transactions)
+        store.save("rfm_store/")
+        X = store.features(snapshot_date="2011-12-10")
+    """
+
+    def __init__(self):
+        # Blocks of aggregates over disjoint sets of customers
+        self._tables = []
+        # StockCodes seen so far; a code's position is its product id
+        self.stock_codes = pd.Index([], dtype=object)
+        # Disjoint sorted runs of _encode_pairs keys of the pairs seen
+        self._pair_runs = []
+
+    def __len__(self):
+        return sum(len(table) for table in self._tables)
+
+    @property
+    def table(self):
+        """Aggregates of every customer as one DataFrame."""
+        if not self._tables:
+            return _empty_table()
+        if len(self._tables) > 1:
+            self._tables = [pd.concat(self._tables)]
+        return self._tables[0]
+
+    @table.setter
+    def table(self, table):
+        self._tables = [table] if len(table) else []
+
+    @property
+    def pairs(self):
+        """Sorted _encode_pairs keys of the distinct pairs seen so far."""
+        if not self._pair_runs:
+            return np.empty(0, dtype=np.int64)
+        if len(self._pair_runs) > 1:
+            merged = np.sort(np.concatenate(self._pair_runs), kind="stable")
+            self._pair_runs = [merged]
+        return self._pair_runs[0]
+
+    @pairs.setter
+    def pairs(self, pairs):
+        self._pair_runs = [pairs] if len(pairs) else []
+
+    def update(self, df):
+        """
+        Fold a batch of cleaned invoice lines into the store.
+
+        df needs CustomerID, InvoiceNo, StockCode, Quantity, UnitPrice and
+        InvoiceDate. Returns the number of customers touched.
+        """
+        if len(df) == 0:
+            return 0
+
+        dates = df["InvoiceDate"]
+        if not pd.api.types.is_datetime64_any_dtype(dates):
+            dates = pd.to_datetime(dates)
+
+        lines = pd.DataFrame({
+            "CustomerID": df["CustomerID"].to_numpy(),
+            "InvoiceNo": df["InvoiceNo"].to_numpy(),
+            "Quantity": df["Quantity"].to_numpy(),
+            "Amount": (df["Quantity"] * df["UnitPrice"]).to_numpy(),
+            "InvoiceDate": dates.to_numpy()
+        })
+        delta = lines.groupby("CustomerID").agg(
+            LastInvoiceDate=("InvoiceDate", "max"),
+            InvoiceCount=("InvoiceNo", "nunique"),
+            MonetarySum=("Amount", "sum"),
+            QuantitySum=("Quantity", "sum")
+        )
+        new_pairs = self._add_pairs(df)
+        delta["UniqueProducts"] = (
+            pd.Series(new_pairs >> 32).value_counts()
+            .reindex(delta.index.astype(np.int64), fill_value=0)
+            .to_numpy()
+        )
+        delta = delta[AGGREGATE_COLUMNS].astype(AGGREGATE_DTYPES)
+
+        known = np.zeros(len(delta), dtype=bool)
+        for table in self._tables:
+            rows = table.index.get_indexer(delta.index)
+            found = rows >= 0
+            if found.any():
+                _fold(table, rows[found], delta[found])
+                known |= found
+
+        if not known.all():
+            self._tables.append(delta[~known].copy())
+            _compact(self._tables, _merge_tables)
+
+        return len(delta)
+
+    def _product_ids(self, stock_codes):
+        """Ids of stock_codes, registering codes not seen before."""
+        # Look up each distinct code once (cheap for categoricals)
+        codes, uniques = pd.factorize(stock_codes)
+        uniques = np.asarray(uniques, dtype=object)
+        ids = self.stock_codes.get_indexer(uniques)
+        unseen = ids < 0
+        if unseen.any():
+            self.stock_codes = self.stock_codes.append(
+                pd.Index(uniques[unseen], dtype=object)
+            )
+            ids[unseen] = self.stock_codes.get_indexer(uniques[unseen])
+        return ids[codes]
+
+    def _add_pairs(self, df):
+        """Add the batch's unseen pairs as a new run and return them."""
+        batch = np.sort(_encode_pairs(
+            df["CustomerID"].to_numpy(), self._product_ids(df["StockCode"])
+        ))
+        batch = batch[np.r_[True, batch[1:] != batch[:-1]]]
+
+        unseen = np.ones(len(batch), dtype=bool)
+        for run in self._pair_runs:
+            positions = np.searchsorted(run, batch)
+            seen = positions < len(run)
+            seen[seen] = run[positions[seen]] == batch[seen]
+            unseen &= ~seen
+
+        new = batch[unseen]
+        if len(new):
+            self._pair_runs.append(new)
+            _compact(self._pair_runs, _merge_pairs)
+        return new
+
+    def features(self, snapshot_date=None, customers=None):
+        """
+        Model features (RFM_FEATURES) as of snapshot_date.
+
+        snapshot_date defaults to one day after the latest invoice in the
+        store, matching a full rebuild. customers restricts the output.
+        """
+        table = self.table if customers is None else self.table.loc[customers]
+
+        if snapshot_date is None:
+            last_dates = self.table["LastInvoiceDate"]
+            snapshot_date = default_snapshot_date(last_dates)
+        snapshot_date = pd.Timestamp(snapshot_date)
+
+        return pd.DataFrame({
+            "Recency": (snapshot_date - table["LastInvoiceDate"]).dt.days,
+            "Frequency": table["InvoiceCount"],
+            "Monetary": table["MonetarySum"],
+            "TotalQuantity": table["QuantitySum"],
+            "UniqueProducts": table["UniqueProducts"]
+        }, index=table.index)[RFM_FEATURES]
+
+    def save(self, path):
+        """Write table, stock codes and pairs as Parquet files under path."""
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        self.table.to_parquet(path / "table.parquet")
+        pd.DataFrame({"StockCode": self.stock_codes.astype(str)}) \
+            .to_parquet(path / "stock_codes.parquet", index=False)
+        pd.DataFrame({"pair": self.pairs}) \
+            .to_parquet(path / "pairs.parquet", index=False)
+
+    @classmethod
+    def load(cls, path):
+        """Load a saved store, or start an empty one if path does not exist."""
+        store = cls()
+        path = Path(path)
+        if path.exists():
+            store.table = pd.read_parquet(path / "table.parquet")
+            store.stock_codes = pd.Index(
+                pd.read_parquet(path / "stock_codes.parquet")["StockCode"],
+                dtype=object
+            )
+            store.pairs = pd.read_parquet(path / "pairs.parquet")["pair"] \
+                .to_numpy(dtype=np.int64)
+        return store
+
+
+def _fold(table, rows, delta):
+    """Add delta's aggregates into table's rows (positions), in place."""
+    column = table.columns.get_loc("LastInvoiceDate")
+    table.iloc[rows, column] = np.maximum(
+        table["LastInvoiceDate"].to_numpy()[rows],
+        delta["LastInvoiceDate"].to_numpy()
+    )
+    for name in SUM_COLUMNS:
+        column = table.columns.get_loc(name)
+        table.iloc[rows, column] = (
+            table[name].to_numpy()[rows] + delta[name].to_numpy()
+        )
@@ -0,0 +1,150 @@
+"""
+Bounded LRU + TTL cache in front of predict_customer_segment.
+
+Entries are keyed by the exact feature tuple (optionally rounded to
+`decimals`) and the artifact version. The artifact files are re-stat'ed
+at most every check_interval seconds; when they change on disk the
+version's entries are dropped and the registry reloads the models.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from inference.predictor import predict_customer_segment
+from inference.registry import DEFAULT_VERSION, registry as default_registry
+
+
+class PredictionCache:
+    """
+        cache = PredictionCache(maxsize=100_000, ttl=3600)
+        result = cache.predict({"Recency": 30, ...})
+        cache.stats()  # hits, misses, hit_rate, evictions, ...
+    """
+
+    def __init__(self, maxsize: int = 100_000, ttl: float = 3600.0,
+                 check_interval: float = 1.0, decimals: int = None,
+                 registry=default_registry):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.check_interval = check_interval
+        self.decimals = decimals
+        self.registry = registry
+
+        self._entries = OrderedDict()
+        self._fingerprints = {}
+        self._checked_at = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def _key(self, input_dict, version, fingerprint):
+        values = tuple(input_dict.items())
+        if self.decimals is not None:
+            values = tuple((k, round(v, self.decimals)) for k, v in values)
+        return version, fingerprint, values
+
+    def check_artifacts(self, version: str = None) -> str:
+        """
+        Drop the version's entries if its artifacts changed on disk.
+
+        Returns the fingerprint the version's entries are current for;
+        pass it to get() and put() around scoring a miss.
+        """
+        version = version or DEFAULT_VERSION
+        now = time.monotonic()
+        with self._lock:
+            last_checked = self._checked_at.get(version, float("-inf"))
+            if now - last_checked < self.check_interval:
+                return self._fingerprints[version]
+
+        fingerprint = self.registry.fingerprint(version)
+
+        with self._lock:
+            self._checked_at[version] = now
+            previous = self._fingerprints.get(version)
+            if previous == fingerprint:
+                return fingerprint
+
+            self._fingerprints[version] = fingerprint
+            if previous is not None:
+                stale = [k for k in self._entries if k[0] == version]
+                for k in stale:
+                    del self._entries[k]
+                self.invalidations += len(stale)
+                self.registry.unload(version)
+        return fingerprint
+
+    def get(self, input_dict: dict, version: str = None,
+            fingerprint: str = None):
+        """Cached result for input_dict, or None."""
+        version = version or DEFAULT_VERSION
+        if fingerprint is None:
+            fingerprint = self.check_artifacts(version)
+        key = self._key(input_dict, version, fingerprint)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, result = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(result)
+
+    def put(self, input_dict: dict, result: dict, version: str = None,
+            fingerprint: str = None):
+        """
+        Store result. If fingerprint is given (check_artifacts() before
+        the result was scored) and the artifacts have changed since, the
+        result is stale and is dropped instead.
+        """
+        version = version or DEFAULT_VERSION
+
+        with self._lock:
+            current = self._fingerprints.get(version)
+            if fingerprint is not None and fingerprint != current:
+                return
+            key = self._key(input_dict, version, current)
+            self._entries[key] = (time.monotonic() + self.ttl, dict(result))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def predict(self, input_dict: dict, version: str = None):
+        """predict_customer_segment, served from the cache when possible."""
+        fingerprint = self.check_artifacts(version)
+        result = self.get(input_dict, version, fingerprint)
+        if result is None:
+            result = predict_customer_segment(input_dict, version)
+            self.put(input_dict, result, version, fingerprint)
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations
+        }
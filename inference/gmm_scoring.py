@@ -0,0 +1,93 @@
+import numpy as np
+
+
+def estimate_weighted_log_prob(X, means, precisions_cholesky, weights,
+                               covariance_type: str = "full"):
+    """
+    Per-component log(weight_k * N(x | mu_k, Sigma_k)) for every row of X.
+
+    Mirrors GaussianMixture._estimate_weighted_log_prob, but works on raw
+    parameter arrays so it can be evaluated once and reused for both the
+    hard assignment and the responsibilities.
+    """
+    X = np.asarray(X, dtype=np.float64)
+    n_samples, n_features = X.shape
+    n_components = means.shape[0]
+
+    if covariance_type == "full":
+        log_det = np.log(
+            np.diagonal(precisions_cholesky, axis1=1, axis2=2)
+        ).sum(axis=1)
+        log_prob = np.empty((n_samples, n_components))
+        for k in range(n_components):
+            prec_chol = precisions_cholesky[k]
+            y = X @ prec_chol - means[k] @ prec_chol
+            log_prob[:, k] = np.square(y).sum(axis=1)
+
+    elif covariance_type == "tied":
+        log_det = np.log(np.diag(precisions_cholesky)).sum()
+        log_prob = np.empty((n_samples, n_components))
+        for k in range(n_components):
+            y = X @ precisions_cholesky - means[k] @ precisions_cholesky
+            log_prob[:, k] = np.square(y).sum(axis=1)
+
+    elif covariance_type == "diag":
+        log_det = np.log(precisions_cholesky).sum(axis=1)
+        precisions = precisions_cholesky ** 2
+        log_prob = (
+            (means ** 2 * precisions).sum(axis=1)
+            - 2.0 * X @ (means * precisions).T
+            + (X ** 2) @ precisions.T
+        )
+
+    elif covariance_type == "spherical":
+        log_det = n_features * np.log(precisions_cholesky)
+        precisions = precisions_cholesky ** 2
+        log_prob = (
+            (means ** 2).sum(axis=1) * precisions
+            - 2.0 * (X @ means.T) * precisions
+            + np.outer((X ** 2).sum(axis=1), precisions)
+        )
+
+    else:
+        raise ValueError(f"Unknown covariance_type: {covariance_type!r}")
+
+    log_gaussian = -0.5 * (n_features * np.log(2 * np.pi) + log_prob) + log_det
+    return log_gaussian + np.log(weights)
+
+
+def assign_from_log_prob(weighted_log_prob, return_proba: bool = False):
+    """
+    Hard cluster, max responsibility and (optionally) all responsibilities
+    from a weighted log-probability matrix, computed in one pass.
+    """
+    cluster = weighted_log_prob.argmax(axis=1)
+    best = np.take_along_axis(weighted_log_prob, cluster[:, None], axis=1)
+
+    # log-sum-exp shifted by the row max, which is also the winning component
+    shifted = np.exp(weighted_log_prob - best)
+    total = shifted.sum(axis=1)
+    confidence = 1.0 / total
+
+    if not return_proba:
+        return cluster, confidence
+
+    return cluster, confidence, shifted / total[:, None]
+
+
+def score_gmm(gmm, X_scaled, return_proba: bool = False):
+    """
+    Fused equivalent of gmm.predict + gmm.predict_proba(...).max(axis=1).
+
+    The per-component log-likelihoods are evaluated once instead of twice.
+    Returns (cluster, confidence) or, with return_proba=True,
+    (cluster, confidence, proba).
+    """
+    weighted_log_prob = estimate_weighted_log_prob(
+        X_scaled,
+        gmm.means_,
+        gmm.precisions_cholesky_,
+        gmm.weights_,
+        gmm.covariance_type
+    )
+    return assign_from_log_prob(weighted_log_prob, return_proba)
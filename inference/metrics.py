@@ -0,0 +1,271 @@
+"""
+Opt-in per-stage timing and size metrics.
+
+    from inference.metrics import metrics
+
+    metrics.enable()            # or run with SEGMENT_METRICS=1
+    predict_customer_segment({...})
+    metrics.snapshot()          # JSON-ready dict
+    metrics.to_prometheus()     # Prometheus text exposition format
+
+Instrumented code wraps its stages in `with metrics.stage("name"):` or
+decorates functions with @timed("name"). Each stage records a latency
+histogram, a call count and an error count (calls that raised); stages
+given rows= also record a histogram of batch sizes. While disabled,
+stage() returns a shared no-op context manager and @timed calls straight
+through, so the cost is one attribute check per stage.
+
+A profiler (see inference.profiling) can be attached to receive every
+stage's start and end as well, whether or not metrics are enabled.
+
+Metrics are per process: workers started by inference.parallel keep
+their own and are not merged into the parent's.
+"""
+import functools
+import inspect
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import nullcontext
+
+# Upper bounds, in seconds and rows (Prometheus "le" buckets)
+LATENCY_BUCKETS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+    0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0
+)
+SIZE_BUCKETS = (1, 10, 100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+_DISABLED = nullcontext()
+
+
+class Histogram:
+    """Cumulative-bucket histogram with a running count and sum."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last one is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float):
+        """Upper bound of the bucket holding the q-th quantile."""
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            total += count
+            yield bound, total
+
+
+class _Stage:
+    __slots__ = ("latency", "sizes", "errors")
+
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.sizes = None
+        self.errors = 0
+
+
+class _StageTimer:
+    __slots__ = ("metrics", "name", "rows", "start")
+
+    def __init__(self, metrics, name, rows):
+        self.metrics = metrics
+        self.name = name
+        self.rows = rows
+
+    def __enter__(self):
+        if self.metrics.profiler is not None:
+            self.metrics.profiler.stage_started(self.name)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.start
+        if self.metrics.enabled:
+            self.metrics.observe(self.name, elapsed, rows=self.rows,
+                                 error=exc_type is not None)
+        if self.metrics.profiler is not None:
+            self.metrics.profiler.stage_finished(self.name)
+        return False
+
+
+class StageMetrics:
+    """Latency, call count, error count and batch sizes per named stage."""
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.profiler = None
+        self.active = enabled
+        self._stages = {}
+        self._lock = threading.Lock()
+
+    def enable(self):
+        self.enabled = self.active = True
+
+    def disable(self):
+        self.enabled = False
+        self.active = self.profiler is not None
+
+    def attach_profiler(self, profiler):
+        """Call profiler.stage_started/stage_finished around every stage."""
+        self.profiler = profiler
+        self.active = True
+
+    def detach_profiler(self):
+        self.profiler = None
+        self.active = self.enabled
+
+    def reset(self):
+        with self._lock:
+            self._stages = {}
+
+    def stage(self, name: str, rows: int = None):
+        """Context manager timing the enclosed block as stage `name`."""
+        if not self.active:
+            return _DISABLED
+        return _StageTimer(self, name, rows)
+
+    def observe(self, name: str, seconds: float, rows: int = None,
+                error: bool = False):
+        """Record one call of stage `name` that took `seconds`."""
+        with self._lock:
+            stage = self._stages.get(name)
+            if stage is None:
+                stage = self._stages[name] = _Stage()
+            stage.latency.observe(seconds)
+            if error:
+                stage.errors += 1
+            if rows is not None:
+                if stage.sizes is None:
+                    stage.sizes = Histogram(SIZE_BUCKETS)
+                stage.sizes.observe(rows)
+
+    def snapshot(self):
+        """Per-stage calls, errors, latency summary and histograms."""
+        with self._lock:
+            stages = {}
+            for name, stage in sorted(self._stages.items()):
+                latency = stage.latency
+                stages[name] = {
+                    "calls": latency.count,
+                    "errors": stage.errors,
+                    "total_s": latency.sum,
+                    "mean_ms": latency.sum / latency.count * 1000,
+                    "p50_le_ms": latency.quantile(0.5) * 1000,
+                    "p99_le_ms": latency.quantile(0.99) * 1000,
+                    "latency_buckets": _buckets(latency)
+                }
+                if stage.sizes is not None:
+                    stages[name]["rows"] = stage.sizes.sum
+                    stages[name]["batch_size_buckets"] = _buckets(stage.sizes)
+            return stages
+
+    def to_prometheus(self, prefix: str = "segment") -> str:
+        """The metrics in the Prometheus text exposition format."""
+        lines = [
+            f"# HELP {prefix}_stage_seconds Time spent per stage call.",
+            f"# TYPE {prefix}_stage_seconds histogram"
+        ]
+        sizes = [
+            f"# HELP {prefix}_stage_batch_rows Rows per stage call.",
+            f"# TYPE {prefix}_stage_batch_rows histogram"
+        ]
+        errors = [
+            f"# HELP {prefix}_stage_errors_total Stage calls that raised.",
+            f"# TYPE {prefix}_stage_errors_total counter"
+        ]
+
+        with self._lock:
+            for name, stage in sorted(self._stages.items()):
+                label = f'stage="{name}"'
+                lines += _histogram_lines(f"{prefix}_stage_seconds", label,
+                                          stage.latency)
+                if stage.sizes is not None:
+                    sizes += _histogram_lines(f"{prefix}_stage_batch_rows",
+                                              label, stage.sizes)
+                errors.append(f"{prefix}_stage_errors_total{{{label}}} "
+                              f"{stage.errors}")
+
+        return "\n".join(lines + sizes + errors) + "\n"
+
+
+def _buckets(histogram):
+    return {_format_bound(bound): count
+            for bound, count in histogram.cumulative()}
+
+
+def _format_bound(bound):
+    return "+Inf" if bound == float("inf") else repr(bound)
+
+
+def _histogram_lines(metric, label, histogram):
+    lines = [f'{metric}_bucket{{{label},le="{_format_bound(bound)}"}} {count}'
+             for bound, count in histogram.cumulative()]
+    lines.append(f"{metric}_sum{{{label}}} {histogram.sum!r}")
+    lines.append(f"{metric}_count{{{label}}} {histogram.count}")
+    return lines
+
+
+metrics = StageMetrics(enabled=os.environ.get("SEGMENT_METRICS") == "1")
+
+
+def _batch_size(value):
+    try:
+        return len(value)
+    except TypeError:
+        return None
+
+
+def timed(name: str, rows: bool = False):
+    """
+    Decorator recording each call as stage `name` of the shared metrics.
+
+    With rows=True, len() of the first parameter, whether passed
+    positionally or by keyword, is recorded as the batch size (nothing
+    is recorded if it has no len()).
+
+    >>> @timed("doctest.total", rows=True)
+    ... def total(values):
+    ...     return sum(values)
+    >>> metrics.enable()
+    >>> total(values=[1, 2, 3])
+    6
+    >>> metrics.snapshot()["doctest.total"]["rows"]
+    3.0
+    >>> metrics.disable()
+    """
+    def decorate(fn):
+        first = None
+        if rows:
+            first = next(iter(inspect.signature(fn).parameters), None)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not metrics.active:
+                return fn(*args, **kwargs)
+
+            size = None
+            if rows and args:
+                size = _batch_size(args[0])
+            elif rows and first in kwargs:
+                size = _batch_size(kwargs[first])
+            with metrics.stage(name, size):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
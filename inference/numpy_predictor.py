@@ -0,0 +1,354 @@
+"""
+sklearn-free serving path.
+
+export_numpy_artifacts() pulls the fitted parameters out of scaler.pkl,
+kmeans.pkl and gmm.pkl into a single .npz; NumpySegmentPredictor loads
+that file and reproduces predict_customer_segment with plain NumPy, so
+serving processes never import sklearn or pay its per-call validation.
+
+export_flat_artifacts() writes the same parameters as one raw .npy file
+per array plus a JSON header (artifacts/flat/ by default). from_flat()
+memory-maps them read-only: loading is O(1) whatever the model size, and
+every process serving the same files shares one copy in the page cache.
+The registry serves a version from its flat export whenever
+flat_is_current() says the export matches the pickles.
+
+Each export goes to its own sub-directory of flat/ and the CURRENT file
+naming it is then replaced in one atomic rename, so readers always find
+a complete export:
+
+    artifacts/flat/CURRENT          -> "v-3k2j9x"
+    artifacts/flat/v-3k2j9x/model.json, scaler_mean.npy, ...
+
+    python -m inference.numpy_predictor [artifact_dir] [out.npz]
+    python -m inference.numpy_predictor --flat [artifact_dir] [out_dir]
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+from inference.gmm_scoring import (
+    assign_from_log_prob,
+    estimate_weighted_log_prob
+)
+
+NPZ_NAME = "model.npz"
+
+FLAT_DIR = "flat"
+FLAT_HEADER = "model.json"
+FLAT_POINTER = "CURRENT"
+FLAT_FORMAT = 1
+# The files a flat export is derived from; their content digest is kept
+# in the header, see flat_is_current
+FLAT_SOURCES = ["scaler.pkl", "kmeans.pkl", "gmm.pkl", "feature_schema.json"]
+FLAT_ARRAYS = [
+    "scaler_mean",
+    "scaler_scale",
+    "kmeans_centroids",
+    "gmm_means",
+    "gmm_precisions_cholesky",
+    "gmm_weights"
+]
+
+
+def extract_parameters(bundle) -> dict:
+    """
+    Flatten a registry ModelBundle into plain NumPy arrays.
+
+    Only a StandardScaler can be expressed as (X - mean) / scale; any
+    other scaler raises TypeError rather than being scored differently.
+    """
+    from sklearn.preprocessing import StandardScaler
+
+    scaler, kmeans, gmm = bundle.scaler, bundle.kmeans, bundle.gmm
+    n_features = len(bundle.features)
+
+    if not isinstance(scaler, StandardScaler):
+        raise TypeError(
+            f"Cannot export {type(scaler).__name__}: the NumPy predictor "
+            f"only reproduces StandardScaler"
+        )
+
+    return {
+        "features": np.array(bundle.features),
+        # transform() ignores mean_/scale_ when with_mean/with_std is off
+        "scaler_mean": scaler.mean_ if scaler.with_mean
+        else np.zeros(n_features),
+        "scaler_scale": scaler.scale_ if scaler.with_std
+        else np.ones(n_features),
+        "kmeans_centroids": kmeans.cluster_centers_,
+        "gmm_means": gmm.means_,
+        "gmm_precisions_cholesky": gmm.precisions_cholesky_,
+        "gmm_weights": gmm.weights_,
+        "gmm_covariance_type": np.array(gmm.covariance_type),
+    }
+
+
+def export_numpy_artifacts(artifact_dir=None, out_path=None) -> Path:
+    """Write the parameters of the artifacts in artifact_dir to one .npz."""
+    from inference.registry import ARTIFACT_DIR, load_bundle
+
+    artifact_dir = Path(artifact_dir or ARTIFACT_DIR)
+    out_path = Path(out_path or artifact_dir / NPZ_NAME)
+
+    np.savez(out_path, **extract_parameters(load_bundle(artifact_dir)))
+    return out_path
+
+
+def export_flat_artifacts(artifact_dir=None, out_dir=None,
+                          bundle=None) -> Path:
+    """
+    Write the parameters as raw float64 .npy files plus FLAT_HEADER.
+
+    bundle defaults to the pickled artifacts in artifact_dir. The files
+    go to a new version directory inside out_dir (default
+    artifact_dir/flat) and FLAT_POINTER is then atomically replaced to
+    name it. Existing files are never truncated under processes that
+    have them mapped; the previous version is kept for readers that
+    resolved the pointer just before the swap, older ones are removed.
+    """
+    from inference.registry import ARTIFACT_DIR, files_digest, load_bundle
+
+    artifact_dir = Path(artifact_dir or ARTIFACT_DIR)
+    out_dir = Path(out_dir or artifact_dir / FLAT_DIR)
+    params = extract_parameters(
+        bundle or load_bundle(artifact_dir, flat=False)
+    )
+
+    header = {
+        "format": FLAT_FORMAT,
+        "features": [str(f) for f in params["features"]],
+        "gmm_covariance_type": str(params["gmm_covariance_type"]),
+        "source_digest": files_digest(artifact_dir, FLAT_SOURCES),
+        "arrays": {}
+    }
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    previous = _read_pointer(out_dir)
+    version_dir = Path(tempfile.mkdtemp(prefix="v-", dir=out_dir))
+    os.chmod(version_dir, 0o755)
+    for name in FLAT_ARRAYS:
+        array = np.ascontiguousarray(params[name], dtype=np.float64)
+        np.save(version_dir / f"{name}.npy", array)
+        header["arrays"][name] = {"file": f"{name}.npy",
+                                  "dtype": array.dtype.str,
+                                  "shape": list(array.shape)}
+    with open(version_dir / FLAT_HEADER, "w") as f:
+        json.dump(header, f, indent=4)
+
+    pointer_tmp = out_dir / f".{FLAT_POINTER}.{version_dir.name}"
+    pointer_tmp.write_text(version_dir.name)
+    os.replace(pointer_tmp, out_dir / FLAT_POINTER)
+
+    # Mapped pages of removed files stay valid in the processes using them
+    keep = {version_dir.name, previous}
+    for entry in out_dir.iterdir():
+        if entry.is_dir() and entry.name not in keep:
+            shutil.rmtree(entry, ignore_errors=True)
+    return out_dir
+
+
+def _read_pointer(flat_dir):
+    try:
+        return (Path(flat_dir) / FLAT_POINTER).read_text().strip()
+    except FileNotFoundError:
+        return None
+
+
+def resolve_flat_dir(flat_dir) -> Path:
+    """
+    The directory holding the current export in flat_dir: the version
+    FLAT_POINTER names, or flat_dir itself when it has no pointer.
+    """
+    flat_dir = Path(flat_dir)
+    current = _read_pointer(flat_dir)
+    return flat_dir if current is None else flat_dir / current
+
+
+def load_flat_parameters(path, mmap_mode: str = "r") -> dict:
+    """
+    Read a flat export as NumpySegmentPredictor keyword arguments.
+
+    path is an export_flat_artifacts directory or one of its versions.
+    With mmap_mode="r" the arrays are read-only memory maps; only the
+    .npy headers are read up front.
+    """
+    path = resolve_flat_dir(path)
+    with open(path / FLAT_HEADER) as f:
+        header = json.load(f)
+    if header.get("format") != FLAT_FORMAT:
+        raise ValueError(
+            f"Unsupported flat artifact format {header.get('format')!r} "
+            f"in {path} (expected {FLAT_FORMAT})"
+        )
+
+    params = {
+        "features": header["features"],
+        "gmm_covariance_type": header["gmm_covariance_type"]
+    }
+    for name, spec in header["arrays"].items():
+        array = np.load(path / spec["file"], mmap_mode=mmap_mode,
+                        allow_pickle=False)
+        if array.dtype.str != spec["dtype"] or \
+                list(array.shape) != spec["shape"]:
+            raise ValueError(
+                f"{path / spec['file']} does not match {FLAT_HEADER}: "
+                f"{array.dtype.str} {list(array.shape)}"
+            )
+        params[name] = array
+    return params
+
+
+def flat_is_current(artifact_dir) -> bool:
+    """
+    Whether artifact_dir/flat exists and was exported from the pickles
+    currently in artifact_dir (and there is no HDBSCAN model, which the
+    flat format does not cover). The pickles are compared by content, so
+    copies that reset mtimes still count as current.
+    """
+    from inference.registry import files_digest
+
+    artifact_dir = Path(artifact_dir)
+    header_path = resolve_flat_dir(artifact_dir / FLAT_DIR) / FLAT_HEADER
+    if not header_path.exists() or (artifact_dir / "hdbscan.pkl").exists():
+        return False
+
+    with open(header_path) as f:
+        header = json.load(f)
+    return (header.get("format") == FLAT_FORMAT
+            and header.get("source_digest")
+            == files_digest(artifact_dir, FLAT_SOURCES))
+
+
+class NumpySegmentPredictor:
+    """Scaler + KMeans + GMM scoring using only NumPy."""
+
+    def __init__(self, features, scaler_mean, scaler_scale, kmeans_centroids,
+                 gmm_means, gmm_precisions_cholesky, gmm_weights,
+                 gmm_covariance_type="full"):
+        self.features = [str(f) for f in features]
+        self.scaler_mean = np.asarray(scaler_mean, dtype=np.float64)
+        self.scaler_scale = np.asarray(scaler_scale, dtype=np.float64)
+        self.kmeans_centroids = np.asarray(kmeans_centroids, dtype=np.float64)
+        self.gmm_means = np.asarray(gmm_means, dtype=np.float64)
+        self.gmm_precisions_cholesky = np.asarray(
+            gmm_precisions_cholesky, dtype=np.float64
+        )
+        self.gmm_weights = np.asarray(gmm_weights, dtype=np.float64)
+        self.gmm_covariance_type = str(gmm_covariance_type)
+
+        self._centroid_sq_norms = (self.kmeans_centroids ** 2).sum(axis=1)
+
+    @classmethod
+    def from_npz(cls, path=None):
+        if path is None:
+            from inference.registry import ARTIFACT_DIR
+            path = ARTIFACT_DIR / NPZ_NAME
+
+        with np.load(path) as data:
+            return cls(**{key: data[key] for key in data.files})
+
+    @classmethod
+    def from_flat(cls, path=None, mmap_mode: str = "r"):
+        """
+        Load an export_flat_artifacts directory (default artifacts/flat),
+        memory-mapped unless mmap_mode is None.
+        """
+        if path is None:
+            from inference.registry import ARTIFACT_DIR
+            path = ARTIFACT_DIR / FLAT_DIR
+
+        return cls(**load_flat_parameters(path, mmap_mode))
+
+    @classmethod
+    def from_bundle(cls, bundle):
+        return cls(**extract_parameters(bundle))
+
+    def scale(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        # Same contract as the sklearn path, which rejects these too
+        if not np.isfinite(X).all():
+            raise ValueError("Input X contains NaN or infinity")
+        return (X - self.scaler_mean) / self.scaler_scale
+
+    def kmeans_predict(self, X_scaled):
+        # argmin ||x - c||^2; the ||x||^2 term is constant per row
+        distances = (
+            self._centroid_sq_norms - 2.0 * X_scaled @ self.kmeans_centroids.T
+        )
+        return distances.argmin(axis=1)
+
+    def gmm_predict(self, X_scaled, return_proba: bool = False):
+        weighted_log_prob = estimate_weighted_log_prob(
+            X_scaled,
+            self.gmm_means,
+            self.gmm_precisions_cholesky,
+            self.gmm_weights,
+            self.gmm_covariance_type
+        )
+        return assign_from_log_prob(weighted_log_prob, return_proba)
+
+    def predict(self, input_dict: dict):
+        """Drop-in equivalent of predictor.predict_customer_segment."""
+        if list(input_dict) != self.features:
+            raise ValueError("Input features do not match training schema")
+
+        X_scaled = self.scale([[input_dict[f] for f in self.features]])
+
+        gmm_cluster, gmm_confidence = self.gmm_predict(X_scaled)
+
+        return {
+            "kmeans_cluster": int(self.kmeans_predict(X_scaled)[0]),
+            "gmm_cluster": int(gmm_cluster[0]),
+            "gmm_confidence": round(float(gmm_confidence[0]), 3)
+        }
+
+    def predict_batch(self, X):
+        """
+        Score a 2-D array whose columns follow self.features.
+
+        Returns a dict of kmeans_cluster, gmm_cluster and gmm_confidence
+        arrays.
+        """
+        X = np.asarray(X)
+        if X.ndim != 2 or X.shape[1] != len(self.features):
+            raise ValueError(
+                f"Expected a 2-D array with {len(self.features)} columns "
+                f"({self.features})"
+            )
+
+        X_scaled = self.scale(X)
+        gmm_cluster, gmm_confidence = self.gmm_predict(X_scaled)
+
+        return {
+            "kmeans_cluster": self.kmeans_predict(X_scaled),
+            "gmm_cluster": gmm_cluster,
+            "gmm_confidence": gmm_confidence.round(3)
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m inference.numpy_predictor",
+        description="Export the fitted parameters for NumPy-only serving."
+    )
+    parser.add_argument("artifact_dir", nargs="?", default=None)
+    parser.add_argument("out", nargs="?", default=None,
+                        help=f"Output .npz (default artifact_dir/{NPZ_NAME}) "
+                             f"or, with --flat, directory "
+                             f"(default artifact_dir/{FLAT_DIR})")
+    parser.add_argument("--flat", action="store_true",
+                        help="Write memory-mappable .npy files + JSON header")
+    args = parser.parse_args(argv)
+
+    export = export_flat_artifacts if args.flat else export_numpy_artifacts
+    print(export(args.artifact_dir, args.out))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+"""
+Multi-process batch scoring.
+
+Each worker process loads the artifacts once, in the pool initializer, and
+then only receives feature shards; the models are never pickled per task.
+Results come back in submission order. The chunk size travels with each
+task, so one pool serves any chunk size.
+
+predict_customer_segments_batch(workers=N) scores through shared_pool(),
+which keeps one started pool per (workers, version) for the life of the
+process instead of spawning workers on every call.
+
+When the version has an up-to-date flat/ export (see
+inference.numpy_predictor), the registry in each worker memory-maps it
+instead of unpickling the models, so all of them share one copy of the
+parameters.
+"""
+import atexit
+import math
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from itertools import repeat
+
+import numpy as np
+import pandas as pd
+
+from inference.registry import DEFAULT_VERSION, registry
+
+RESULT_COLUMNS = {
+    "kmeans_cluster": np.int64,
+    "gmm_cluster": np.int64,
+    "gmm_confidence": np.float64
+}
+HDBSCAN_COLUMNS = {
+    "hdbscan_cluster": np.int64,
+    "is_outlier": bool
+}
+
+_worker_version = DEFAULT_VERSION
+
+_shared_pools = {}
+_shared_lock = threading.Lock()
+
+
+def _init_worker(version, path):
+    global _worker_version
+
+    # One BLAS thread per process, otherwise N workers x M threads thrash
+    from threadpoolctl import threadpool_limits
+    threadpool_limits(1)
+
+    registry.register(version, path)
+    registry.get(version)
+
+    _worker_version = version
+
+
+def _score_shard(X, chunk_size):
+    from inference.predictor import predict_customer_segments_batch
+
+    result = predict_customer_segments_batch(
+        X, chunk_size=chunk_size, version=_worker_version
+    )
+    return {column: result[column].to_numpy() for column in result.columns}
+
+
+class ScoringPool:
+    """
+    Process pool that scores feature arrays with preloaded artifacts.
+
+    Use as a context manager:
+
+        with ScoringPool(workers=8) as pool:
+            segments = pool.score(X)
+    """
+
+    def __init__(self, workers: int = None, version: str = None,
+                 chunk_size: int = 100_000):
+        self.workers = workers or os.cpu_count()
+        self.version = version or DEFAULT_VERSION
+        self.chunk_size = chunk_size
+        bundle = registry.get(self.version)
+        self.features = bundle.features
+        self.columns = dict(RESULT_COLUMNS)
+        if bundle.hdbscan is not None:
+            self.columns.update(HDBSCAN_COLUMNS)
+        self._executor = None
+
+    def start(self):
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(self.version, str(registry.path_for(self.version)))
+        )
+        return self
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.shutdown()
+
+    def score(self, X, chunk_size: int = None):
+        """
+        Score a feature DataFrame or 2-D array across all workers,
+        chunk_size (default self.chunk_size) rows at a time.
+        """
+        from inference.predictor import _as_feature_frame
+
+        chunk_size = chunk_size or self.chunk_size
+        df = _as_feature_frame(X, self.features)
+        values = df.to_numpy(dtype=np.float64)
+
+        shard_size = max(1, min(chunk_size,
+                                math.ceil(len(values) / self.workers)))
+        shards = [values[start:start + shard_size]
+                  for start in range(0, len(values), shard_size)]
+
+        parts = list(self._executor.map(_score_shard, shards,
+                                        repeat(chunk_size)))
+        return self._merge(parts, df.index)
+
+    def score_chunks(self, chunks, max_pending: int = None):
+        """
+        Score an iterable of DataFrames, yielding (chunk, result) in order.
+
+        At most max_pending chunks (default 2 per worker) are in flight, so
+        a lazily read file is never pulled into memory all at once.
+        """
+        max_pending = max_pending or 2 * self.workers
+        pending = deque()
+
+        for chunk in chunks:
+            X = chunk[self.features].to_numpy(dtype=np.float64)
+            future = self._executor.submit(_score_shard, X, self.chunk_size)
+            pending.append((chunk, future))
+
+            if len(pending) >= max_pending:
+                chunk, future = pending.popleft()
+                yield chunk, self._merge([future.result()], chunk.index)
+
+        while pending:
+            chunk, future = pending.popleft()
+            yield chunk, self._merge([future.result()], chunk.index)
+
+    def _merge(self, parts, index):
+        # Same columns and dtypes whether or not there were any rows
+        return pd.DataFrame({
+            column: np.concatenate([part[column] for part in parts])
+            if parts else np.empty(0, dtype=dtype)
+            for column, dtype in self.columns.items()
+        }, index=index)
+
+
+class _SharedPool:
+    __slots__ = ("pool", "fingerprint", "users", "retired")
+
+    def __init__(self, pool, fingerprint):
+        self.pool = pool
+        self.fingerprint = fingerprint
+        self.users = 0
+        self.retired = False
+
+
+@contextmanager
+def shared_pool(workers: int = None, version: str = None):
+    """
+    A started ScoringPool shared by every caller with the same workers
+    and version:
+
+        with shared_pool(8) as pool:
+            segments = pool.score(X, chunk_size=50_000)
+
+    When the version's artifacts change on disk the next caller gets a
+    new pool; the old one is shut down once its last user is done.
+    Pools still in place are shut down when the process exits.
+    """
+    version = version or DEFAULT_VERSION
+    key = (workers or os.cpu_count(), version)
+    fingerprint = registry.fingerprint(version)
+
+    retire = None
+    with _shared_lock:
+        entry = _shared_pools.get(key)
+        if entry is None or entry.fingerprint != fingerprint:
+            if entry is not None:
+                entry.retired = True
+                if entry.users == 0:
+                    retire = entry.pool
+            entry = _SharedPool(ScoringPool(*key).start(), fingerprint)
+            _shared_pools[key] = entry
+        entry.users += 1
+    if retire is not None:
+        retire.shutdown()
+
+    try:
+        yield entry.pool
+    finally:
+        with _shared_lock:
+            entry.users -= 1
+            done = entry.retired and entry.users == 0
+        if done:
+            entry.pool.shutdown()
+
+
+@atexit.register
+def _shutdown_shared_pools():
+    with _shared_lock:
+        entries = list(_shared_pools.values())
+        _shared_pools.clear()
+    for entry in entries:
+        entry.pool.shutdown()
@@ -1,23 +1,47 @@
-import joblib
-import json
 import numpy as np
 import pandas as pd
-from pathlib import Path
 
-BASE_DIR = Path(__file__).resolve().parent.parent
-ARTIFACT_DIR = BASE_DIR / "artifacts"
+from inference.gmm_scoring import score_gmm
+from inference.metrics import metrics, timed
+from inference.registry import ARTIFACT_DIR, BASE_DIR, registry
 
-scaler = joblib.load(ARTIFACT_DIR / "scaler.pkl")
-kmeans = joblib.load(ARTIFACT_DIR / "kmeans.pkl")
-gmm = joblib.load(ARTIFACT_DIR / "gmm.pkl")
+# Artifacts are loaded lazily by the registry on first prediction.
+# The historical module attributes (scaler, kmeans, gmm, FEATURE_SCHEMA,
+# FEATURES) still resolve, to the default version, via __getattr__ below.
+_BUNDLE_ATTRS = {
+    "scaler": lambda b: b.scaler,
+    "kmeans": lambda b: b.kmeans,
+    "gmm": lambda b: b.gmm,
+    "FEATURE_SCHEMA": lambda b: b.feature_schema,
+    "FEATURES": lambda b: b.features,
+}
 
-with open(ARTIFACT_DIR / "feature_schema.json") as f:
-    FEATURE_SCHEMA = json.load(f)
 
-FEATURES = FEATURE_SCHEMA["features"]
+def __getattr__(name):
+    if name in _BUNDLE_ATTRS:
+        return _BUNDLE_ATTRS[name](registry.get())
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
-def predict_customer_segment(input_dict: dict):
+def _scorers(bundle):
+    """(scale, kmeans_predict, gmm_predict) for the bundle's models."""
+    if bundle.flat is not None:
+        flat = bundle.flat
+        return flat.scale, flat.kmeans_predict, flat.gmm_predict
+    gmm = bundle.gmm
+    return (bundle.scaler.transform, bundle.kmeans.predict,
+            lambda X_scaled: score_gmm(gmm, X_scaled))
+
+
+def _hdbscan_predict(clusterer, X_scaled):
+    import hdbscan
+
+    labels, _ = hdbscan.approximate_predict(clusterer, X_scaled)
+    return labels
+
+
+@timed("predict")
+def predict_customer_segment(input_dict: dict, version: str = None):
     """
     input_dict example:
     {
@@ -27,26 +51,134 @@ def predict_customer_segment(input_dict: dict):
         "TotalQuantity": 200,
         "UniqueProducts": 20
     }
+
+    version selects a named artifact version from the registry
+    (defaults to the artifacts/ directory itself). Versions that ship an
+    HDBSCAN model also return hdbscan_cluster and is_outlier. Versions
+    with a current flat/ export are scored from it with NumPy.
+
+    Stages are timed in inference.metrics when it is enabled.
     """
+    with metrics.stage("predict.registry"):
+        bundle = registry.get(version)
+        scale, kmeans_predict, gmm_predict = _scorers(bundle)
 
-    df = pd.DataFrame([input_dict])
+    with metrics.stage("predict.frame"):
+        df = pd.DataFrame([input_dict])
 
     # Schema validation
-    if list(df.columns) != FEATURES:
-        raise ValueError("Input features do not match training schema")
+    with metrics.stage("predict.schema"):
+        if list(df.columns) != bundle.features:
+            raise ValueError("Input features do not match training schema")
 
     # Scaling
-    X_scaled = scaler.transform(df)
+    with metrics.stage("predict.scale"):
+        X_scaled = scale(df)
 
-    # Predictions
-    kmeans_cluster = int(kmeans.predict(X_scaled)[0])
-    gmm_cluster = int(gmm.predict(X_scaled)[0])
-    gmm_confidence = float(gmm.predict_proba(X_scaled).max())
+    # Predictions (GMM predict and predict_proba are one fused pass)
+    with metrics.stage("predict.kmeans"):
+        kmeans_cluster = int(kmeans_predict(X_scaled)[0])
+    with metrics.stage("predict.gmm"):
+        gmm_clusters, gmm_confidences = gmm_predict(X_scaled)
+    gmm_cluster = int(gmm_clusters[0])
+    gmm_confidence = float(gmm_confidences[0])
 
-    return {
+    result = {
         "kmeans_cluster": kmeans_cluster,
         "gmm_cluster": gmm_cluster,
         "gmm_confidence": round(gmm_confidence, 3)
     }
 
+    if bundle.hdbscan is not None:
+        with metrics.stage("predict.hdbscan"):
+            labels = _hdbscan_predict(bundle.hdbscan, X_scaled)
+        hdbscan_cluster = int(labels[0])
+        result["hdbscan_cluster"] = hdbscan_cluster
+        result["is_outlier"] = hdbscan_cluster == -1
+
+    return result
+
+
+def _as_feature_frame(X, features):
+    if isinstance(X, pd.DataFrame):
+        missing = [f for f in features if f not in X.columns]
+        if missing:
+            raise ValueError(f"Input is missing training features: {missing}")
+        return X[features]
+
+    X = np.asarray(X)
+    if X.ndim != 2 or X.shape[1] != len(features):
+        raise ValueError(
+            f"Expected a 2-D array with {len(features)} columns ({features})"
+        )
+    return pd.DataFrame(X, columns=features)
+
+
+@timed("predict_batch", rows=True)
+def predict_customer_segments_batch(X, chunk_size: int = 100_000,
+                                    version: str = None, workers: int = 1):
+    """
+    Vectorized counterpart of predict_customer_segment.
+
+    X is a DataFrame holding the training features (extra columns are
+    ignored) or a 2-D array whose columns follow FEATURE_SCHEMA order.
+    Rows are scored chunk_size at a time so memory stays bounded. With
+    workers > 1 the rows are sharded across a process pool whose workers
+    each load the artifacts once; the pool is started on first use and
+    reused by later calls with the same workers and version (see
+    inference.parallel.shared_pool).
+
+    Returns a DataFrame with kmeans_cluster, gmm_cluster and gmm_confidence
+    columns (plus hdbscan_cluster and is_outlier when the version ships an
+    HDBSCAN model), aligned with the input index.
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be a positive integer")
+
+    if workers > 1:
+        from inference.parallel import shared_pool
+
+        with shared_pool(workers, version) as pool:
+            return pool.score(X, chunk_size)
+
+    bundle = registry.get(version)
+    scale, kmeans_predict, gmm_predict = _scorers(bundle)
+    with metrics.stage("predict_batch.frame"):
+        df = _as_feature_frame(X, bundle.features)
+    n = len(df)
+
+    kmeans_cluster = np.empty(n, dtype=np.int64)
+    gmm_cluster = np.empty(n, dtype=np.int64)
+    gmm_confidence = np.empty(n, dtype=np.float64)
+    hdbscan_cluster = None
+    if bundle.hdbscan is not None:
+        hdbscan_cluster = np.empty(n, dtype=np.int64)
+
+    for start in range(0, n, chunk_size):
+        stop = min(start + chunk_size, n)
+        rows = stop - start
+        with metrics.stage("predict_batch.scale", rows):
+            X_scaled = scale(df.iloc[start:stop])
+
+        with metrics.stage("predict_batch.kmeans", rows):
+            kmeans_cluster[start:stop] = kmeans_predict(X_scaled)
+        with metrics.stage("predict_batch.gmm", rows):
+            gmm_cluster[start:stop], gmm_confidence[start:stop] = \
+                gmm_predict(X_scaled)
+        if hdbscan_cluster is not None:
+            with metrics.stage("predict_batch.hdbscan", rows):
+                hdbscan_cluster[start:stop] = _hdbscan_predict(
+                    bundle.hdbscan, X_scaled
+                )
+
+    result = pd.DataFrame({
+        "kmeans_cluster": kmeans_cluster,
+        "gmm_cluster": gmm_cluster,
+        "gmm_confidence": gmm_confidence.round(3)
+    }, index=df.index)
+
+    if hdbscan_cluster is not None:
+        result["hdbscan_cluster"] = hdbscan_cluster
+        result["is_outlier"] = hdbscan_cluster == -1
 
+    return result
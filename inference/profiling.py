@@ -0,0 +1,330 @@
+"""
+Profiling for the batch-scoring and training entry points.
+
+    python -m inference.score in.parquet out.parquet --profile full
+    python -m training data.csv --profile sample --profile-report nightly.txt
+
+    with Profiler("sample") as profiler:
+        score_file(...)
+    profiler.write_report("profile.txt")
+
+Both modes record wall and CPU seconds for every inference.metrics stage
+(clean -> RFM/behaviour features -> scaling -> KMeans/GMM, and the
+training pipeline steps), plus whole-run totals.
+
+- "full" adds cProfile function statistics and the tracemalloc peak
+  memory of each stage. Expect the run to be several times slower.
+- "sample" adds a background thread that records the profiled thread's
+  stack every `interval` seconds. At the default 100 Hz this costs about
+  a percent, cheap enough to leave on for production runs.
+
+write_report writes a text report to the given path, the same data as
+JSON next to it (.profile.json) and the raw profile: cProfile stats
+(.pstats, for pstats/snakeviz) or collapsed stacks (.stacks, for
+flamegraph.pl and speedscope). The CLIs wrap their work in
+profiled(args), which does all of this for --profile/--profile-report.
+
+Stages are attributed per thread, but tracemalloc peaks are process-wide,
+so "full" is meant for the single-threaded CLIs. Work done in
+inference.parallel worker processes is not profiled.
+"""
+import cProfile
+import io
+import json
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+
+from inference.metrics import metrics
+
+MODES = ("full", "sample")
+
+
+class StackSampler:
+    """Periodically samples one thread's Python stack from a daemon thread."""
+
+    def __init__(self, interval: float = 0.01, thread_id: int = None):
+        self.interval = interval
+        self.thread_id = thread_id or threading.get_ident()
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True,
+                                        name="stack-sampler")
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_filename}:{code.co_name}")
+                frame = frame.f_back
+            self.stacks[tuple(reversed(stack))] += 1
+            self.samples += 1
+
+    def collapsed(self):
+        """Stacks in the collapsed "root;...;leaf count" format."""
+        return "".join(f"{';'.join(stack)} {count}\n"
+                       for stack, count in self.stacks.most_common())
+
+    def top(self, n: int = 30):
+        """(function, inclusive samples, own samples), by inclusive count."""
+        inclusive, own = Counter(), Counter()
+        for stack, count in self.stacks.items():
+            own[stack[-1]] += count
+            for function in set(stack):
+                inclusive[function] += count
+        return [(function, count, own[function])
+                for function, count in inclusive.most_common(n)]
+
+
+class _StageTotals:
+    __slots__ = ("calls", "wall", "cpu", "peak")
+
+    def __init__(self):
+        self.calls = 0
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.peak = None
+
+
+class Profiler:
+    """
+    Context manager profiling everything run inside it; see module docs.
+
+    Stages are reported flat by name; a stage's time includes the stages
+    nested inside it (e.g. predict_batch includes predict_batch.gmm).
+    """
+
+    def __init__(self, mode: str = "full", interval: float = 0.01):
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {MODES}, got {mode!r}")
+        self.mode = mode
+        self.interval = interval
+        self.stages = {}
+        self.wall = self.cpu = None
+        self.peak = None
+        self._run_peak = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._cprofile = None
+        self._sampler = None
+
+    # Whole run
+
+    def __enter__(self):
+        if self.mode == "full":
+            tracemalloc.start()
+            self._cprofile = cProfile.Profile()
+        else:
+            self._sampler = StackSampler(self.interval)
+
+        metrics.attach_profiler(self)
+        self._wall0, self._cpu0 = time.perf_counter(), time.process_time()
+        if self._cprofile is not None:
+            self._cprofile.enable()
+        else:
+            self._sampler.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._cprofile is not None:
+            self._cprofile.disable()
+        else:
+            self._sampler.stop()
+        self.wall = time.perf_counter() - self._wall0
+        self.cpu = time.process_time() - self._cpu0
+        metrics.detach_profiler()
+
+        if self.mode == "full":
+            _, peak = tracemalloc.get_traced_memory()
+            self.peak = max(self._run_peak, peak)
+            tracemalloc.stop()
+        return False
+
+    # Stages (called by inference.metrics)
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def stage_started(self, name):
+        peak = None
+        if self.mode == "full":
+            current, peak = tracemalloc.get_traced_memory()
+            stack = self._stack()
+            if stack:
+                # Keep the enclosing stage's peak before resetting it
+                stack[-1][4] = max(stack[-1][4], peak)
+            self._run_peak = max(self._run_peak, peak)
+            tracemalloc.reset_peak()
+            peak = current
+        self._stack().append(
+            [name, time.perf_counter(), time.process_time(), peak, peak]
+        )
+
+    def stage_finished(self, name):
+        stack = self._stack()
+        _, wall0, cpu0, start, peak = stack.pop()
+        wall = time.perf_counter() - wall0
+        cpu = time.process_time() - cpu0
+
+        used = None
+        if self.mode == "full":
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+            used = peak - start
+            if stack:
+                stack[-1][4] = max(stack[-1][4], peak)
+
+        with self._lock:
+            totals = self.stages.get(name)
+            if totals is None:
+                totals = self.stages[name] = _StageTotals()
+            totals.calls += 1
+            totals.wall += wall
+            totals.cpu += cpu
+            if used is not None:
+                totals.peak = max(totals.peak or 0, used)
+
+    # Reporting
+
+    def report(self, top: int = 30):
+        """JSON-ready summary: totals, per-stage table and top functions."""
+        report = {
+            "mode": self.mode,
+            "wall_s": self.wall,
+            "cpu_s": self.cpu,
+            "peak_traced_mb": _mb(self.peak),
+            "stages": {
+                name: {
+                    "calls": totals.calls,
+                    "wall_s": totals.wall,
+                    "cpu_s": totals.cpu,
+                    "peak_traced_mb": _mb(totals.peak)
+                }
+                for name, totals in sorted(self.stages.items())
+            }
+        }
+
+        if self._cprofile is not None:
+            stats = pstats.Stats(self._cprofile)
+            rows = sorted(stats.stats.items(), key=lambda item: -item[1][3])
+            report["functions"] = [
+                {"function": pstats.func_std_string(function),
+                 "calls": calls, "own_s": own, "cumulative_s": cumulative}
+                for function, (_, calls, own, cumulative, _) in rows[:top]
+            ]
+        elif self._sampler is not None:
+            samples = max(self._sampler.samples, 1)
+            report["samples"] = self._sampler.samples
+            report["functions"] = [
+                {"function": function, "inclusive": inclusive / samples,
+                 "own": own / samples}
+                for function, inclusive, own in self._sampler.top(top)
+            ]
+        return report
+
+    def format_report(self, top: int = 30) -> str:
+        report = self.report(top)
+        lines = [f"Profile ({self.mode}): wall {report['wall_s']:.3f}s, "
+                 f"cpu {report['cpu_s']:.3f}s"
+                 + (f", peak traced memory {report['peak_traced_mb']:.1f} MB"
+                    if report["peak_traced_mb"] is not None else ""),
+                 "",
+                 f"{'stage':40} {'calls':>7} {'wall s':>10} {'cpu s':>10} "
+                 f"{'peak MB':>9}"]
+        for name, stage in report["stages"].items():
+            peak = stage["peak_traced_mb"]
+            lines.append(
+                f"{name:40} {stage['calls']:7d} {stage['wall_s']:10.3f} "
+                f"{stage['cpu_s']:10.3f} "
+                f"{'-' if peak is None else f'{peak:.1f}':>9}"
+            )
+        lines.append("")
+
+        if self._cprofile is not None:
+            out = io.StringIO()
+            pstats.Stats(self._cprofile, stream=out) \
+                .sort_stats("cumulative").print_stats(top)
+            lines.append(out.getvalue())
+        elif self._sampler is not None:
+            lines.append(f"Top functions over {report['samples']} samples "
+                         f"every {self.interval * 1000:g} ms:")
+            lines.append(f"{'inclusive':>10} {'own':>7}  function")
+            for row in report["functions"]:
+                lines.append(f"{row['inclusive']:10.1%} {row['own']:7.1%}  "
+                             f"{row['function']}")
+        return "\n".join(lines) + "\n"
+
+    def write_report(self, path, top: int = 30):
+        """
+        Write the text report to path, plus .profile.json and
+        .pstats/.stacks (distinct suffixes, so path may end in .json).
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(self.format_report(top))
+        with open(path.with_suffix(".profile.json"), "w") as f:
+            json.dump(self.report(top), f, indent=4)
+
+        if self._cprofile is not None:
+            self._cprofile.dump_stats(path.with_suffix(".pstats"))
+        elif self._sampler is not None:
+            path.with_suffix(".stacks").write_text(self._sampler.collapsed())
+        return path
+
+
+def _mb(n_bytes):
+    return None if n_bytes is None else n_bytes / 2**20
+
+
+def add_profile_arguments(parser, default_report: str):
+    """The --profile/--profile-report options shared by the CLIs."""
+    parser.add_argument("--profile", choices=MODES,
+                        help="Profile the run: 'full' (cProfile + "
+                             "tracemalloc) or 'sample' (low overhead)")
+    parser.add_argument("--profile-report", default=default_report,
+                        metavar="PATH",
+                        help="Where to write the profile report "
+                             f"(default {default_report})")
+
+
+@contextmanager
+def profiled(args):
+    """
+    Profile the enclosed block as the add_profile_arguments options ask
+    and write the report once it ends, even if it raised. Yields the
+    Profiler, or None without --profile.
+    """
+    if not args.profile:
+        yield None
+        return
+
+    profiler = Profiler(args.profile)
+    try:
+        with profiler:
+            yield profiler
+    finally:
+        print(f"Profile -> {profiler.write_report(args.profile_report)}",
+              file=sys.stderr)
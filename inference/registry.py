@@ -0,0 +1,259 @@
+import hashlib
+import joblib
+import json
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+ARTIFACT_DIR = BASE_DIR / "artifacts"
+
+DEFAULT_VERSION = "default"
+
+ARTIFACT_FILES = [
+    "scaler.pkl",
+    "kmeans.pkl",
+    "gmm.pkl",
+    "feature_schema.json",
+    "hdbscan.pkl",
+    "flat/CURRENT"
+]
+
+SKLEARN_MODELS = ["scaler", "kmeans", "gmm"]
+
+
+@dataclass(frozen=True)
+class ModelBundle:
+    """
+    Fitted artifacts of one model version, loaded together.
+
+    models maps "scaler", "kmeans" and "gmm" to the fitted sklearn
+    objects. When the version is served from its flat export, flat is
+    the memory-mapped NumpySegmentPredictor and models starts empty; the
+    scaler/kmeans/gmm attributes then unpickle from path on first use.
+    """
+
+    version: str
+    path: Path
+    feature_schema: dict = field(repr=False)
+    models: dict = field(default_factory=dict, repr=False)
+    # Optional: only present when the version ships hdbscan.pkl
+    hdbscan: object = None
+    flat: object = field(default=None, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock,
+                                  repr=False, compare=False)
+
+    @property
+    def features(self):
+        return self.feature_schema["features"]
+
+    def _model(self, name):
+        model = self.models.get(name)
+        if model is None:
+            with self._lock:
+                model = self.models.get(name)
+                if model is None:
+                    model = joblib.load(self.path / f"{name}.pkl")
+                    self.models[name] = model
+        return model
+
+    @property
+    def scaler(self):
+        return self._model("scaler")
+
+    @property
+    def kmeans(self):
+        return self._model("kmeans")
+
+    @property
+    def gmm(self):
+        return self._model("gmm")
+
+
+def files_fingerprint(path, names) -> str:
+    """sha1 over the names, sizes and mtimes of the files that exist."""
+    path = Path(path)
+    digest = hashlib.sha1()
+    for name in names:
+        try:
+            stat = (path / name).stat()
+        except FileNotFoundError:
+            continue
+        digest.update(f"{name}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    return digest.hexdigest()[:16]
+
+
+def files_digest(path, names) -> str:
+    """
+    sha256 over the names and contents of the files that exist.
+
+    Unlike files_fingerprint this survives copies that do not keep
+    mtimes (cp -r, git checkout, downloads).
+    """
+    path = Path(path)
+    digest = hashlib.sha256()
+    for name in names:
+        try:
+            f = open(path / name, "rb")
+        except FileNotFoundError:
+            continue
+        with f:
+            digest.update(f"{name};".encode())
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def load_bundle(path, version: str = DEFAULT_VERSION,
+                flat: bool = True) -> ModelBundle:
+    """
+    Load feature_schema.json and the models from path.
+
+    If flat is true and path has a current flat/ export (see
+    inference.numpy_predictor.flat_is_current), it is memory-mapped and
+    the pickles are only loaded if the sklearn models are asked for.
+    Otherwise scaler.pkl, kmeans.pkl, gmm.pkl and, if present,
+    hdbscan.pkl are loaded.
+    """
+    from inference.numpy_predictor import (
+        FLAT_DIR,
+        NumpySegmentPredictor,
+        flat_is_current
+    )
+
+    path = Path(path)
+    if not path.is_dir():
+        raise FileNotFoundError(f"Artifact directory not found: {path}")
+
+    with open(path / "feature_schema.json") as f:
+        feature_schema = json.load(f)
+
+    if flat and flat_is_current(path):
+        return ModelBundle(
+            version=version,
+            path=path,
+            feature_schema=feature_schema,
+            flat=NumpySegmentPredictor.from_flat(path / FLAT_DIR)
+        )
+
+    hdbscan_path = path / "hdbscan.pkl"
+
+    return ModelBundle(
+        version=version,
+        path=path,
+        feature_schema=feature_schema,
+        models={name: joblib.load(path / f"{name}.pkl")
+                for name in SKLEARN_MODELS},
+        hdbscan=joblib.load(hdbscan_path) if hdbscan_path.exists() else None
+    )
+
+
+class ModelRegistry:
+    """
+    Lazily loaded, thread-safe cache of named artifact versions.
+
+    The default version lives directly in base_dir; every sub-directory of
+    base_dir holding a feature_schema.json is picked up as a named version
+    (e.g. artifacts/v2/). Other locations can be added with register().
+    Nothing touches the disk until a version is first requested.
+    """
+
+    def __init__(self, base_dir=ARTIFACT_DIR):
+        self.base_dir = Path(base_dir)
+        self._paths = {}
+        self._bundles = {}
+        self._loaded_fingerprints = {}
+        self._load_locks = {}
+        self._lock = threading.Lock()
+
+    def register(self, version: str, path) -> None:
+        """Serve the artifacts in path under the given version name."""
+        with self._lock:
+            self._paths[version] = Path(path)
+            self._bundles.pop(version, None)
+            self._loaded_fingerprints.pop(version, None)
+
+    def path_for(self, version: str = DEFAULT_VERSION) -> Path:
+        if version in self._paths:
+            return self._paths[version]
+        if version == DEFAULT_VERSION:
+            return self.base_dir
+        return self.base_dir / version
+
+    def versions(self):
+        """Names of all versions that can currently be served."""
+        names = set(self._paths)
+        if (self.base_dir / "feature_schema.json").exists():
+            names.add(DEFAULT_VERSION)
+        if self.base_dir.is_dir():
+            names.update(
+                p.name for p in self.base_dir.iterdir()
+                if (p / "feature_schema.json").exists()
+            )
+        return sorted(names)
+
+    def get(self, version: str = None) -> ModelBundle:
+        """Return the bundle for version, loading it on first use."""
+        version = version or DEFAULT_VERSION
+
+        bundle = self._bundles.get(version)
+        if bundle is not None:
+            return bundle
+
+        with self._lock:
+            load_lock = self._load_locks.setdefault(version, threading.Lock())
+
+        # One loader per version; other versions can load concurrently
+        with load_lock:
+            bundle = self._bundles.get(version)
+            if bundle is None:
+                # Taken first, so files replaced mid-load count as changed
+                fingerprint = self.fingerprint(version)
+                bundle = load_bundle(self.path_for(version), version)
+                with self._lock:
+                    self._bundles[version] = bundle
+                    self._loaded_fingerprints[version] = fingerprint
+
+        return bundle
+
+    def fingerprint(self, version: str = None) -> str:
+        """
+        Cheap identity of the artifact files on disk (names, sizes, mtimes).
+
+        Changes whenever a version is re-exported; used to invalidate
+        anything derived from the loaded models.
+        """
+        return files_fingerprint(self.path_for(version or DEFAULT_VERSION),
+                                 ARTIFACT_FILES)
+
+    def refresh(self, version: str = None) -> str:
+        """
+        Unload version if its files changed since it was loaded.
+
+        Returns the current fingerprint, to key anything derived from the
+        models that get() will serve next.
+        """
+        version = version or DEFAULT_VERSION
+        fingerprint = self.fingerprint(version)
+        with self._lock:
+            loaded = self._loaded_fingerprints.get(version)
+            if loaded is not None and loaded != fingerprint:
+                self._bundles.pop(version, None)
+                del self._loaded_fingerprints[version]
+        return fingerprint
+
+    def is_loaded(self, version: str = DEFAULT_VERSION) -> bool:
+        return version in self._bundles
+
+    def unload(self, version: str = None) -> None:
+        """Drop one cached version (or all of them) so it is reloaded."""
+        with self._lock:
+            if version is None:
+                self._bundles.clear()
+                self._loaded_fingerprints.clear()
+            else:
+                self._bundles.pop(version, None)
+                self._loaded_fingerprints.pop(version, None)
+
+
+registry = ModelRegistry()
@@ -0,0 +1,181 @@
+"""
+Score a customer feature file in bounded memory.
+
+    python -m inference.score customers.csv segments.parquet
+
+Input is CSV or Parquet holding the FEATURE_SCHEMA columns (other columns
+are passed through). It is read chunksize rows at a time, scored with
+predict_customer_segments_batch and appended to the output, so memory use
+does not grow with file size. --workers N spreads chunks over N processes.
+--profile writes a timing/memory report (see inference.profiling).
+"""
+import argparse
+import sys
+from contextlib import ExitStack
+from pathlib import Path
+
+import pandas as pd
+
+from inference.metrics import metrics
+from inference.predictor import predict_customer_segments_batch
+from inference.profiling import add_profile_arguments, profiled
+from inference.registry import registry
+
+DEFAULT_CHUNKSIZE = 100_000
+
+
+def _is_parquet(path) -> bool:
+    return Path(path).suffix.lower() in (".parquet", ".pq")
+
+
+def read_columns(path):
+    """Column names of the input file, read without loading any data."""
+    if _is_parquet(path):
+        import pyarrow.parquet as pq
+        return pq.ParquetFile(path).schema_arrow.names
+    return list(pd.read_csv(path, nrows=0).columns)
+
+
+def iter_chunks(path, chunksize: int = DEFAULT_CHUNKSIZE, dtype=None):
+    """Yield the input file as DataFrames of at most chunksize rows."""
+    if _is_parquet(path):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+        return
+
+    yield from pd.read_csv(path, chunksize=chunksize, dtype=dtype)
+
+
+def _timed_chunks(chunks, stage):
+    """Attribute the time spent producing each chunk to stage."""
+    chunks = iter(chunks)
+    while True:
+        with metrics.stage(stage):
+            chunk = next(chunks, None)
+        if chunk is None:
+            return
+        yield chunk
+
+
+class _CsvWriter:
+    def __init__(self, path):
+        self.path = path
+        self._header = True
+
+    def write(self, df):
+        df.to_csv(self.path, mode="w" if self._header else "a",
+                  header=self._header, index=False)
+        self._header = False
+
+    def close(self):
+        if self._header:
+            # Empty input: still leave a (header-less) file behind
+            Path(self.path).touch()
+
+
+class _ParquetWriter:
+    def __init__(self, path):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self._pa = pa
+        self._pq = pq
+        self.path = path
+        self._writer = None
+
+    def write(self, df):
+        table = self._pa.Table.from_pandas(df, preserve_index=False)
+        if self._writer is None:
+            self._writer = self._pq.ParquetWriter(self.path, table.schema)
+        else:
+            # pandas may infer a different dtype per chunk (e.g. int vs float)
+            table = table.cast(self._writer.schema)
+        self._writer.write_table(table)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+def open_writer(path):
+    return _ParquetWriter(path) if _is_parquet(path) else _CsvWriter(path)
+
+
+def check_columns(columns, features):
+    """Validate the file header against the training schema, once per file."""
+    missing = [f for f in features if f not in columns]
+    if missing:
+        raise ValueError(f"Input file is missing training features: {missing}")
+
+
+def _score_sequential(chunks, features, chunksize, version):
+    for chunk in chunks:
+        yield chunk, predict_customer_segments_batch(
+            chunk[features].to_numpy(), chunk_size=chunksize, version=version
+        )
+
+
+def score_file(in_path, out_path, chunksize: int = DEFAULT_CHUNKSIZE,
+               version: str = None, workers: int = 1) -> int:
+    """
+    Stream in_path through the predictor into out_path.
+
+    Returns the number of rows scored.
+    """
+    features = registry.get(version).features
+    check_columns(read_columns(in_path), features)
+
+    dtype = {f: "float64" for f in features}
+    chunks = _timed_chunks(iter_chunks(in_path, chunksize, dtype), "score.read")
+
+    n_rows = 0
+    with ExitStack() as stack:
+        if workers > 1:
+            from inference.parallel import ScoringPool
+
+            pool = stack.enter_context(
+                ScoringPool(workers, version, chunksize)
+            )
+            scored = pool.score_chunks(chunks)
+        else:
+            scored = _score_sequential(chunks, features, chunksize, version)
+
+        writer = open_writer(out_path)
+        stack.callback(writer.close)
+
+        for chunk, result in scored:
+            for column in result.columns:
+                chunk[column] = result[column].to_numpy()
+
+            with metrics.stage("score.write", len(chunk)):
+                writer.write(chunk)
+            n_rows += len(chunk)
+
+    return n_rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m inference.score",
+        description="Score a customer feature file (CSV or Parquet)."
+    )
+    parser.add_argument("input", help="CSV or Parquet file of customer features")
+    parser.add_argument("output", help="Destination .csv or .parquet file")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE,
+                        help="Rows read and scored per chunk")
+    parser.add_argument("--version", default=None,
+                        help="Artifact version to score with")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Scoring processes (default 1, in-process)")
+    add_profile_arguments(parser, "score_profile.txt")
+    args = parser.parse_args(argv)
+
+    with profiled(args):
+        n_rows = score_file(args.input, args.output, args.chunksize,
+                            args.version, args.workers)
+    print(f"Scored {n_rows} rows -> {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,337 @@
+"""
+HTTP scoring service (plain ASGI, no web framework needed).
+
+    uvicorn inference.service:app --host 0.0.0.0 --port 8000
+
+    POST /predict        {"Recency": 30, "Frequency": 5, ...}
+    POST /predict/batch  {"customers": [{...}, {...}]}
+    GET  /metrics        request counts, batch sizes, p50/p95/p99 latency,
+                         prediction cache hit rate (and per-stage predictor
+                         timings when SEGMENT_METRICS=1)
+    GET  /metrics/prometheus  the per-stage timings as Prometheus text
+    GET  /health
+
+Single-customer requests go through a MicroBatcher: requests arriving
+within max_wait_ms of each other are scored together with one
+predict_customer_segments_batch call, off the event loop. Set
+SEGMENT_CACHE_SIZE > 0 to put a PredictionCache in front of them.
+"""
+import asyncio
+import json
+import math
+import os
+import time
+from collections import deque
+
+import numpy as np
+
+from inference.cache import PredictionCache
+from inference.metrics import metrics as stage_metrics
+from inference.predictor import predict_customer_segments_batch
+from inference.registry import registry
+
+MAX_BATCH_SIZE = int(os.environ.get("SEGMENT_MAX_BATCH_SIZE", 512))
+MAX_WAIT_MS = float(os.environ.get("SEGMENT_MAX_WAIT_MS", 2.0))
+CACHE_SIZE = int(os.environ.get("SEGMENT_CACHE_SIZE", 0))
+
+
+def _feature_row(customer, features, where: str = "Input"):
+    """
+    Customer dict as a list of finite floats in schema order.
+
+    Raises ValueError (a 422) for a wrong schema or a value that is not a
+    finite number, so bad input never reaches a shared micro-batch.
+    """
+    if not isinstance(customer, dict) or list(customer) != features:
+        raise ValueError(f"{where} features do not match training schema")
+
+    row = []
+    for feature in features:
+        value = customer[feature]
+        try:
+            if isinstance(value, bool):
+                raise TypeError
+            value = float(value)
+        except (TypeError, ValueError):
+            raise ValueError(
+                f"{where}: {feature} must be a number, got {value!r}"
+            ) from None
+        if not math.isfinite(value):
+            raise ValueError(f"{where}: {feature} must be finite")
+        row.append(value)
+    return row
+
+
+def _score_rows(rows, version):
+    """
+    Score rows together, falling back to one at a time if the batch fails.
+
+    Returns one record dict or exception per row, so a row that cannot be
+    scored only fails its own request.
+    """
+    try:
+        X = np.array(rows, dtype=np.float64)
+        return _records(predict_customer_segments_batch(X, len(X), version))
+    except Exception:
+        if len(rows) == 1:
+            raise
+
+    outcomes = []
+    for row in rows:
+        try:
+            outcomes.append(_score_rows([row], version)[0])
+        except Exception as exc:
+            outcomes.append(exc)
+    return outcomes
+
+
+def _records(result):
+    """predict_customer_segments_batch output as JSON-ready dicts."""
+    columns = {c: result[c].to_numpy().tolist() for c in result.columns}
+    return [dict(zip(columns, row)) for row in zip(*columns.values())]
+
+
+class MicroBatcher:
+    """
+    Collects concurrent single-row requests into vectorized batches.
+
+    A batch is flushed when it reaches max_batch_size rows or max_wait_ms
+    after its first row arrived, whichever comes first.
+    """
+
+    def __init__(self, max_batch_size: int = MAX_BATCH_SIZE,
+                 max_wait_ms: float = MAX_WAIT_MS, version: str = None):
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.version = version
+        self.batch_sizes = deque(maxlen=10_000)
+        self._queue = None
+        self._worker = None
+
+    def _ensure_started(self):
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        if self._worker is None or self._worker.done():
+            # Reuses the queue, so rows already waiting are not abandoned
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def submit(self, row):
+        """Score one feature row (list in schema order); returns a dict."""
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((row, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+
+            while len(batch) < self.max_batch_size:
+                # Drain what is already queued without suspending
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(
+                        await asyncio.wait_for(self._queue.get(), timeout)
+                    )
+                except asyncio.TimeoutError:
+                    break
+
+            self.batch_sizes.append(len(batch))
+            try:
+                outcomes = await loop.run_in_executor(
+                    None, _score_rows, [row for row, _ in batch], self.version
+                )
+            except Exception as exc:
+                outcomes = [exc] * len(batch)
+
+            for (_, future), outcome in zip(batch, outcomes):
+                if future.done():
+                    continue
+                if isinstance(outcome, Exception):
+                    future.set_exception(outcome)
+                else:
+                    future.set_result(outcome)
+
+
+class LatencyTracker:
+    """Per-route request counts and a window of recent latencies."""
+
+    def __init__(self, window: int = 100_000):
+        self.window = window
+        self.latencies = {}
+        self.counts = {}
+        self.errors = {}
+
+    def record(self, route, seconds, ok=True):
+        self.latencies.setdefault(route, deque(maxlen=self.window))
+        self.latencies[route].append(seconds)
+        self.counts[route] = self.counts.get(route, 0) + 1
+        if not ok:
+            self.errors[route] = self.errors.get(route, 0) + 1
+
+    def snapshot(self):
+        routes = {}
+        for route, values in self.latencies.items():
+            ms = np.array(values) * 1000
+            p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+            routes[route] = {
+                "requests": self.counts[route],
+                "errors": self.errors.get(route, 0),
+                "p50_ms": round(float(p50), 3),
+                "p95_ms": round(float(p95), 3),
+                "p99_ms": round(float(p99), 3),
+                "max_ms": round(float(ms.max()), 3)
+            }
+        return routes
+
+
+class ScoringService:
+    """ASGI application exposing the predictor over HTTP."""
+
+    def __init__(self, batcher: MicroBatcher = None, version: str = None,
+                 cache: PredictionCache = None):
+        self.version = version
+        self.batcher = batcher or MicroBatcher(version=version)
+        self.cache = cache
+        if cache is None and CACHE_SIZE > 0:
+            self.cache = PredictionCache(maxsize=CACHE_SIZE)
+        self.latency = LatencyTracker()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+
+        start = time.perf_counter()
+        route = f"{scope['method']} {scope['path']}"
+        try:
+            status, payload = await self._dispatch(scope, receive)
+        except ValueError as exc:
+            status, payload = 422, {"error": str(exc)}
+        except Exception as exc:
+            status, payload = 500, {"error": repr(exc)}
+
+        await _send_json(send, status, payload)
+        if status == 404:
+            route = "unmatched"
+        self.latency.record(route, time.perf_counter() - start, status < 400)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                # Load the artifacts before the first request arrives
+                await asyncio.get_running_loop().run_in_executor(
+                    None, registry.get, self.version
+                )
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _dispatch(self, scope, receive):
+        method, path = scope["method"], scope["path"].rstrip("/")
+
+        if method == "GET" and path == "/health":
+            return 200, {"status": "ok"}
+        if method == "GET" and path == "/metrics":
+            return 200, self.metrics()
+        if method == "GET" and path == "/metrics/prometheus":
+            return 200, stage_metrics.to_prometheus()
+        if method == "POST" and path == "/predict":
+            return 200, await self.predict(await _read_json(receive))
+        if method == "POST" and path == "/predict/batch":
+            return 200, await self.predict_batch(await _read_json(receive))
+
+        return 404, {"error": f"No route for {method} {scope['path']}"}
+
+    async def predict(self, customer):
+        features = registry.get(self.version).features
+        row = _feature_row(customer, features)
+
+        if self.cache is None:
+            return await self.batcher.submit(row)
+
+        fingerprint = self.cache.check_artifacts(self.version)
+        result = self.cache.get(customer, self.version, fingerprint)
+        if result is None:
+            result = await self.batcher.submit(row)
+            self.cache.put(customer, result, self.version, fingerprint)
+        return result
+
+    async def predict_batch(self, body):
+        customers = body.get("customers") if isinstance(body, dict) else body
+        if not isinstance(customers, list):
+            raise ValueError('Expected {"customers": [...]}')
+
+        features = registry.get(self.version).features
+        rows = [_feature_row(customer, features, f"Customer {i}")
+                for i, customer in enumerate(customers)]
+
+        X = np.array(rows, dtype=np.float64).reshape(-1, len(features))
+        result = await asyncio.get_running_loop().run_in_executor(
+            None, predict_customer_segments_batch, X, 100_000, self.version
+        )
+        return {"results": _records(result)}
+
+    def metrics(self):
+        sizes = np.array(self.batcher.batch_sizes or [0])
+        stages = stage_metrics.snapshot() if stage_metrics.enabled else None
+        return {
+            "routes": self.latency.snapshot(),
+            "micro_batches": {
+                "count": len(self.batcher.batch_sizes),
+                "mean_size": round(float(sizes.mean()), 2),
+                "max_size": int(sizes.max())
+            },
+            "cache": None if self.cache is None else self.cache.stats(),
+            "stages": stages
+        }
+
+
+async def _read_json(receive):
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            break
+    try:
+        return json.loads(body or b"null")
+    except json.JSONDecodeError as exc:
+        raise ValueError(f"Invalid JSON: {exc}") from None
+
+
+async def _send_json(send, status, payload):
+    """Send payload as JSON, or as plain text if it already is a str."""
+    if isinstance(payload, str):
+        body, content_type = payload.encode(), b"text/plain; version=0.0.4"
+    else:
+        body, content_type = json.dumps(payload).encode(), b"application/json"
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", content_type),
+                    (b"content-length", str(len(body)).encode())]
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+app = ScoringService()
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run("inference.service:app", host="0.0.0.0",
+                port=int(os.environ.get("PORT", 8000)))
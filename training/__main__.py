@@ -0,0 +1,67 @@
+"""
+Train and export the segmentation artifacts.
+
+    python -m training customer_segmentation.csv --out artifacts
+    python -m training data.csv --config training.json --plots reports/
+    python -m training data.csv --metrics metrics.prom
+    python -m training data.csv --profile full --profile-report report.txt
+"""
+import argparse
+import json
+from inference.metrics import metrics
+from inference.profiling import add_profile_arguments, profiled
+from inference.registry import ARTIFACT_DIR
+from training.pipeline import export_artifacts, run_pipeline, save_plots
+
+
+def _write_metrics(path):
+    with open(path, "w") as f:
+        if path.endswith(".json"):
+            json.dump(metrics.snapshot(), f, indent=4)
+        else:
+            f.write(metrics.to_prometheus())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m training",
+        description="Run the cached training pipeline and export artifacts."
+    )
+    parser.add_argument("data", help="Online Retail transactions CSV")
+    parser.add_argument("--config", help="JSON file of per-stage overrides")
+    parser.add_argument("--out", default=str(ARTIFACT_DIR),
+                        help="Artifact directory to export to")
+    parser.add_argument("--cache", default=".pipeline_cache",
+                        help="Directory of memoized stage outputs")
+    parser.add_argument("--plots", metavar="DIR",
+                        help="Also write the notebook figures to DIR")
+    parser.add_argument("--metrics", metavar="PATH",
+                        help="Write per-stage timings to PATH (.json for "
+                             "JSON, otherwise Prometheus text)")
+    add_profile_arguments(parser, "training_profile.txt")
+    args = parser.parse_args(argv)
+
+    if args.metrics:
+        metrics.enable()
+
+    config = {}
+    if args.config:
+        with open(args.config) as f:
+            config = json.load(f)
+    config.setdefault("load", {})["path"] = args.data
+
+    with profiled(args):
+        outputs = run_pipeline(config, args.cache)
+        with metrics.stage("training.export"):
+            export_artifacts(outputs, args.out)
+        if args.plots:
+            with metrics.stage("training.plots"):
+                save_plots(outputs, args.plots)
+    if args.metrics:
+        _write_metrics(args.metrics)
+
+    print(json.dumps(outputs["evaluate"], indent=4))
+
+
+if __name__ == "__main__":
+    main()
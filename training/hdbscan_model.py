@@ -0,0 +1,61 @@
+"""
+Density-based segmentation with HDBSCAN (notebook section 10).
+
+HDBSCAN does not scale to every customer and cannot label new points on
+its own, so it is fitted on a stratified subsample with
+prediction_data=True; new customers are then assigned with
+hdbscan.approximate_predict at serving time (label -1 = outlier).
+"""
+import numpy as np
+
+from training.selection import RANDOM_STATE
+
+
+def stratified_subsample(strata, n_samples: int,
+                         random_state: int = RANDOM_STATE):
+    """
+    Sorted row indices of a random subsample that keeps the share of each
+    stratum (e.g. KMeans cluster). Every stratum keeps at least one row.
+    """
+    strata = np.asarray(strata)
+    if n_samples >= len(strata):
+        return np.arange(len(strata))
+
+    rng = np.random.default_rng(random_state)
+    _, inverse, counts = np.unique(strata, return_inverse=True,
+                                   return_counts=True)
+    quota = np.maximum(1, np.round(counts * n_samples / len(strata)))
+
+    # Shuffle, then group rows by stratum keeping the shuffled order
+    order = rng.permutation(len(strata))
+    grouped = order[np.argsort(inverse[order], kind="stable")]
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+
+    idx = np.concatenate([
+        grouped[start:start + int(q)] for start, q in zip(starts, quota)
+    ])
+    return np.sort(idx)
+
+
+def fit_hdbscan(X, strata=None, sample_size: int = 50_000,
+                min_cluster_size: int = 30, min_samples: int = 15,
+                random_state: int = RANDOM_STATE):
+    """
+    Fit HDBSCAN (notebook parameters) with prediction data on a subsample.
+
+    strata (e.g. KMeans labels) keeps every segment represented in the
+    subsample; without it the subsample is uniform.
+    """
+    import hdbscan
+
+    X = np.asarray(X, dtype=np.float64)
+    if strata is None:
+        strata = np.zeros(len(X), dtype=np.int64)
+
+    idx = stratified_subsample(strata, sample_size, random_state)
+
+    return hdbscan.HDBSCAN(
+        min_cluster_size=min_cluster_size,
+        min_samples=min_samples,
+        prediction_data=True
+    ).fit(X[idx])
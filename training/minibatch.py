@@ -0,0 +1,169 @@
+"""
+Streaming KMeans training.
+
+Fits MiniBatchKMeans with partial_fit over chunks of scaled customer
+features, optionally warm-started from the currently deployed centroids,
+so retraining neither needs the full matrix in memory nor starts from
+scratch. The result is saved as kmeans.pkl and is served by
+inference/predictor.py unchanged (it only calls .predict).
+
+    python -m training.minibatch customers.csv --out artifacts/v2 --warm-start
+"""
+import argparse
+import json
+import shutil
+from pathlib import Path
+
+import joblib
+import numpy as np
+from sklearn.cluster import KMeans, MiniBatchKMeans
+from sklearn.metrics import adjusted_rand_score
+
+from inference.numpy_predictor import export_flat_artifacts
+from inference.registry import ARTIFACT_DIR, load_bundle
+from inference.score import iter_chunks
+from training.selection import RANDOM_STATE
+
+
+def iter_scaled_chunks(path, scaler, features, chunksize: int = 100_000):
+    """Yield scaled feature arrays from a CSV/Parquet customer file."""
+    for chunk in iter_chunks(path, chunksize):
+        yield scaler.transform(chunk[features])
+
+
+def _centroids(init):
+    if init is None or isinstance(init, str):
+        return init
+    return getattr(init, "cluster_centers_", init)
+
+
+def train_minibatch_kmeans(chunks, n_clusters: int = 4, init=None,
+                           batch_size: int = 4096, n_epochs: int = 1,
+                           random_state: int = RANDOM_STATE):
+    """
+    Fit MiniBatchKMeans over an iterable of scaled feature arrays.
+
+    init is a fitted KMeans or a centroid array to warm-start from
+    (default: k-means++ on the first batch). For n_epochs > 1, chunks must
+    be a zero-argument callable returning a fresh iterable per epoch.
+    """
+    centroids = _centroids(init)
+    if centroids is None:
+        model = MiniBatchKMeans(n_clusters=n_clusters, batch_size=batch_size,
+                                random_state=random_state)
+    else:
+        centroids = np.asarray(centroids, dtype=np.float64)
+        model = MiniBatchKMeans(n_clusters=len(centroids), init=centroids,
+                                n_init=1, batch_size=batch_size,
+                                random_state=random_state)
+
+    for _ in range(n_epochs):
+        for chunk in (chunks() if callable(chunks) else chunks):
+            for start in range(0, len(chunk), batch_size):
+                batch = chunk[start:start + batch_size]
+                # The very first partial_fit needs at least k rows
+                started = hasattr(model, "cluster_centers_")
+                if not started and len(batch) < model.n_clusters:
+                    continue
+                model.partial_fit(batch)
+
+    return model
+
+
+def quality_report(X_sample, model, reference=None,
+                   random_state: int = RANDOM_STATE) -> dict:
+    """
+    Compare a streaming model with full-batch KMeans on an in-memory sample.
+
+    reference is the full KMeans to compare with; one is fitted on
+    X_sample if omitted. Reports both inertias, their relative gap, the
+    label agreement (ARI) and how far the centroids moved.
+    """
+    X_sample = np.asarray(X_sample, dtype=np.float64)
+    if reference is None:
+        reference = KMeans(n_clusters=model.n_clusters,
+                           random_state=random_state).fit(X_sample)
+
+    labels = model.predict(X_sample)
+    reference_labels = reference.predict(X_sample)
+    inertia = float(-model.score(X_sample))
+    reference_inertia = float(-reference.score(X_sample))
+
+    # Match each streaming centroid to its nearest reference centroid
+    shift = np.linalg.norm(
+        model.cluster_centers_[:, None, :]
+        - reference.cluster_centers_[None, :, :],
+        axis=2
+    ).min(axis=1)
+
+    return {
+        "n_sample": len(X_sample),
+        "inertia": inertia,
+        "full_kmeans_inertia": reference_inertia,
+        "inertia_gap": inertia / reference_inertia - 1,
+        "ari_vs_full_kmeans": float(
+            adjusted_rand_score(reference_labels, labels)
+        ),
+        "max_centroid_shift": float(shift.max())
+    }
+
+
+def export_kmeans(model, out_dir, source_dir=ARTIFACT_DIR):
+    """
+    Write model as out_dir/kmeans.pkl next to copies of the other
+    artifacts from source_dir, so out_dir is a complete artifact version
+    (including a fresh flat/ export).
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    source_dir = Path(source_dir)
+
+    if source_dir.resolve() != out_dir.resolve():
+        for name in ["scaler.pkl", "gmm.pkl", "feature_schema.json"]:
+            shutil.copy2(source_dir / name, out_dir / name)
+
+    joblib.dump(model, out_dir / "kmeans.pkl")
+    export_flat_artifacts(out_dir)
+    return out_dir / "kmeans.pkl"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m training.minibatch",
+        description="Retrain the KMeans artifact with streaming mini-batches."
+    )
+    parser.add_argument("input", help="CSV or Parquet of customer features")
+    parser.add_argument("--artifacts", default=str(ARTIFACT_DIR),
+                        help="Deployed artifact directory (scaler, centroids)")
+    parser.add_argument("--out", required=True,
+                        help="Directory for the new artifact version")
+    parser.add_argument("--warm-start", action="store_true",
+                        help="Start from the deployed centroids")
+    parser.add_argument("--clusters", type=int, default=4)
+    parser.add_argument("--chunksize", type=int, default=100_000)
+    parser.add_argument("--batch-size", type=int, default=4096)
+    parser.add_argument("--epochs", type=int, default=1)
+    parser.add_argument("--report-sample", type=int, default=50_000,
+                        help="Rows of the first chunk used for the report")
+    args = parser.parse_args(argv)
+
+    bundle = load_bundle(args.artifacts)
+
+    def chunks():
+        return iter_scaled_chunks(args.input, bundle.scaler, bundle.features,
+                                  args.chunksize)
+
+    model = train_minibatch_kmeans(
+        chunks, n_clusters=args.clusters,
+        init=bundle.kmeans if args.warm_start else None,
+        batch_size=args.batch_size, n_epochs=args.epochs
+    )
+    export_kmeans(model, args.out, args.artifacts)
+
+    sample = next(iter_scaled_chunks(args.input, bundle.scaler,
+                                     bundle.features, args.report_sample))
+    print(json.dumps(quality_report(sample, model), indent=4))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,371 @@
+"""
+Reproducible training pipeline (replaces the notebook).
+
+    load -> clean -> features -> scale -> kmeans -> gmm -> evaluate -> export
+                                         \\-> hdbscan (optional)
+
+Every stage is memoized on disk by a hash of its name, its own config
+section, the keys of the stages it reads from, the source code of the
+stage function and the modules it calls, and the sklearn/pandas versions
+its pickled output depends on (the load stage also hashes the input
+file's size and mtime). Changing only the GMM config therefore re-runs
+gmm, evaluate and export and reuses everything else.
+Nothing is plotted unless plots are requested, and then only to files.
+"""
+import copy
+import hashlib
+import importlib
+import inspect
+import json
+import sys
+from collections.abc import Mapping
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.cluster import KMeans
+from sklearn.mixture import GaussianMixture
+from sklearn.preprocessing import StandardScaler
+
+from features.cleaning import clean_transactions, load_transactions
+from features.rfm import RFM_FEATURES, build_rfm
+from inference.metrics import metrics
+from inference.numpy_predictor import export_flat_artifacts
+from inference.registry import ARTIFACT_DIR, ModelBundle
+from training.gmm import COVARIANCE_TYPES, fit_gmm_search
+from training.hdbscan_model import fit_hdbscan
+from training.selection import RANDOM_STATE, score_clustering
+
+FEATURE_DESCRIPTIONS = {
+    "Recency": "Days since last purchase",
+    "Frequency": "Number of invoices",
+    "Monetary": "Total spend",
+    "TotalQuantity": "Total items purchased",
+    "UniqueProducts": "Distinct products purchased"
+}
+
+DEFAULT_CONFIG = {
+    "load": {"path": "customer_segmentation.csv", "encoding": "latin-1",
+             "date_format": None},
+    "clean": {},
+    "features": {"features": RFM_FEATURES, "snapshot_date": None},
+    "scale": {},
+    "kmeans": {"n_clusters": 4, "random_state": RANDOM_STATE},
+    # search=True picks covariance_type and init by BIC (training.gmm)
+    "gmm": {"n_components": 4, "covariance_type": "full",
+            "random_state": RANDOM_STATE, "search": False,
+            "covariance_types": COVARIANCE_TYPES, "n_init": 3,
+            "warm_start": True},
+    # Optional density-based outlier model, fit on a stratified subsample
+    "hdbscan": {"enabled": False, "sample_size": 50_000,
+                "min_cluster_size": 30, "min_samples": 15,
+                "random_state": RANDOM_STATE},
+    "evaluate": {"silhouette_sample_size": 10_000,
+                 "random_state": RANDOM_STATE}
+}
+
+
+def merge_config(overrides=None):
+    """DEFAULT_CONFIG with the given per-stage sections updated."""
+    config = copy.deepcopy(DEFAULT_CONFIG)
+    for stage, section in (overrides or {}).items():
+        config.setdefault(stage, {}).update(section)
+    return config
+
+
+# ------------------------------------------------------------
+# Stages: fn(params, *upstream_outputs) -> output
+# ------------------------------------------------------------
+
+def _load(params):
+    return load_transactions(params["path"], encoding=params["encoding"],
+                             date_format=params["date_format"])
+
+
+def _clean(params, transactions):
+    return clean_transactions(transactions)
+
+
+def _features(params, transactions):
+    rfm = build_rfm(transactions, params["snapshot_date"])
+    return rfm[params["features"]]
+
+
+def _scale(params, customers):
+    scaler = StandardScaler()
+    X_scaled = scaler.fit_transform(customers)
+    return scaler, X_scaled
+
+
+def _kmeans(params, scaled):
+    _, X_scaled = scaled
+    return KMeans(**params).fit(X_scaled)
+
+
+def _gmm(params, scaled, kmeans):
+    _, X_scaled = scaled
+
+    if not params["search"]:
+        gmm = GaussianMixture(
+            n_components=params["n_components"],
+            covariance_type=params["covariance_type"],
+            random_state=params["random_state"]
+        ).fit(X_scaled)
+        return gmm, None
+
+    return fit_gmm_search(
+        X_scaled,
+        n_components=params["n_components"],
+        covariance_types=params["covariance_types"],
+        n_init=params["n_init"],
+        kmeans=kmeans if params["warm_start"] else None,
+        warm_start=params["warm_start"],
+        random_state=params["random_state"]
+    )
+
+
+def _hdbscan(params, scaled, kmeans):
+    if not params["enabled"]:
+        return None
+
+    _, X_scaled = scaled
+    return fit_hdbscan(
+        X_scaled,
+        strata=kmeans.labels_,
+        sample_size=params["sample_size"],
+        min_cluster_size=params["min_cluster_size"],
+        min_samples=params["min_samples"],
+        random_state=params["random_state"]
+    )
+
+
+def _evaluate(params, scaled, kmeans, gmm, hdbscan):
+    _, X_scaled = scaled
+    gmm, search_report = gmm
+    gmm_labels = gmm.predict(X_scaled)
+
+    report = {
+        "n_customers": len(X_scaled),
+        "kmeans": {
+            **score_clustering(X_scaled, kmeans.labels_,
+                               inertia=float(kmeans.inertia_), **params),
+            "cluster_sizes": np.bincount(kmeans.labels_).tolist()
+        },
+        "gmm": {
+            **score_clustering(X_scaled, gmm_labels,
+                               metrics=["silhouette", "calinski_harabasz",
+                                        "davies_bouldin"], **params),
+            "covariance_type": gmm.covariance_type,
+            "bic": float(gmm.bic(X_scaled)),
+            "converged": bool(gmm.converged_),
+            "n_iter": int(gmm.n_iter_),
+            "cluster_sizes": np.bincount(
+                gmm_labels, minlength=gmm.n_components
+            ).tolist(),
+            "search": None if search_report is None
+            else search_report.to_dict(orient="records")
+        }
+    }
+
+    if hdbscan is not None:
+        labels = hdbscan.labels_
+        report["hdbscan"] = {
+            "n_fit": len(labels),
+            "n_clusters": int(labels.max() + 1),
+            "noise_fraction": float((labels == -1).mean())
+        }
+
+    return report
+
+
+class Stage:
+    def __init__(self, name, fn, inputs=(), modules=()):
+        self.name = name
+        self.fn = fn
+        self.inputs = inputs
+        # Modules whose code the stage runs; part of its cache key
+        self.modules = modules
+
+
+STAGES = [
+    Stage("load", _load, modules=["features.cleaning"]),
+    Stage("clean", _clean, ["load"], modules=["features.cleaning"]),
+    Stage("features", _features, ["clean"], modules=["features.rfm"]),
+    Stage("scale", _scale, ["features"]),
+    Stage("kmeans", _kmeans, ["scale"]),
+    Stage("gmm", _gmm, ["scale", "kmeans"], modules=["training.gmm"]),
+    Stage("hdbscan", _hdbscan, ["scale", "kmeans"],
+          modules=["training.hdbscan_model"]),
+    Stage("evaluate", _evaluate, ["scale", "kmeans", "gmm", "hdbscan"],
+          modules=["training.selection"])
+]
+
+
+def _file_fingerprint(path):
+    stat = Path(path).stat()
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def code_fingerprint(stage) -> str:
+    """Hash of the stage's code and of the library versions it pickles."""
+    digest = hashlib.sha1(inspect.getsource(stage.fn).encode())
+    for name in stage.modules:
+        module = importlib.import_module(name)
+        digest.update(inspect.getsource(module).encode())
+    digest.update(f"sklearn={sklearn.__version__};"
+                  f"pandas={pd.__version__}".encode())
+    return digest.hexdigest()[:16]
+
+
+def stage_key(stage, params, input_keys) -> str:
+    payload = {"stage": stage.name, "params": params, "inputs": input_keys,
+               "code": code_fingerprint(stage)}
+    if stage.name == "load":
+        payload["file"] = _file_fingerprint(params["path"])
+    blob = json.dumps(payload, sort_keys=True, default=str).encode()
+    return hashlib.sha1(blob).hexdigest()[:16]
+
+
+class StageOutputs(Mapping):
+    """
+    Stage outputs by stage name. Cached outputs stay on disk until they
+    are first looked up, so a stage nothing downstream re-runs from (the
+    raw load/clean frames, typically) is never read back.
+    """
+
+    def __init__(self):
+        self._values = {}
+        self._paths = {}
+
+    def __setitem__(self, name, value):
+        self._paths.pop(name, None)
+        self._values[name] = value
+
+    def set_cached(self, name, path):
+        self._values.pop(name, None)
+        self._paths[name] = path
+
+    def __getitem__(self, name):
+        if name in self._paths:
+            with metrics.stage(f"training.{name}.load"):
+                self._values[name] = joblib.load(self._paths.pop(name))
+        return self._values[name]
+
+    def __iter__(self):
+        return iter([stage.name for stage in STAGES if stage.name in self])
+
+    def __contains__(self, name):
+        return name in self._values or name in self._paths
+
+    def __len__(self):
+        return len(self._values) + len(self._paths)
+
+
+def run_pipeline(config=None, cache_dir=".pipeline_cache", log=sys.stderr):
+    """
+    Run every stage, reusing cached outputs whose key is unchanged.
+
+    Returns a StageOutputs mapping of stage outputs by stage name; cached
+    outputs are loaded on first access.
+    """
+    config = merge_config(config)
+    cache_dir = Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+
+    keys, outputs = {}, StageOutputs()
+    for stage in STAGES:
+        params = config.get(stage.name, {})
+        key = stage_key(stage, params, [keys[name] for name in stage.inputs])
+        path = cache_dir / f"{stage.name}-{key}.joblib"
+
+        if path.exists():
+            outputs.set_cached(stage.name, path)
+            status = "cached"
+        else:
+            upstream = [outputs[name] for name in stage.inputs]
+            with metrics.stage(f"training.{stage.name}"):
+                outputs[stage.name] = stage.fn(params, *upstream)
+            joblib.dump(outputs[stage.name], path)
+            status = "computed"
+
+        keys[stage.name] = key
+        if log is not None:
+            print(f"[{stage.name:>8}] {status} ({key})", file=log)
+
+    return outputs
+
+
+def export_artifacts(outputs, artifact_dir=ARTIFACT_DIR):
+    """
+    Write the files inference/predictor.py loads (hdbscan.pkl only when
+    that stage is enabled), the memory-mappable flat/ export of the same
+    models, and metrics.json.
+    """
+    artifact_dir = Path(artifact_dir)
+    artifact_dir.mkdir(parents=True, exist_ok=True)
+
+    scaler, _ = outputs["scale"]
+    features = list(outputs["features"].columns)
+
+    joblib.dump(scaler, artifact_dir / "scaler.pkl")
+    joblib.dump(outputs["kmeans"], artifact_dir / "kmeans.pkl")
+    gmm, _ = outputs["gmm"]
+    joblib.dump(gmm, artifact_dir / "gmm.pkl")
+
+    # The predictor serves hdbscan.pkl whenever it exists, so drop stale ones
+    hdbscan_path = artifact_dir / "hdbscan.pkl"
+    if outputs["hdbscan"] is not None:
+        joblib.dump(outputs["hdbscan"], hdbscan_path)
+    else:
+        hdbscan_path.unlink(missing_ok=True)
+
+    feature_schema = {
+        "features": features,
+        "description": {f: FEATURE_DESCRIPTIONS.get(f, f) for f in features},
+        "gmm_covariance_type": gmm.covariance_type
+    }
+    with open(artifact_dir / "feature_schema.json", "w") as f:
+        json.dump(feature_schema, f, indent=4)
+
+    # Written after the pickles so its source digest matches them
+    export_flat_artifacts(artifact_dir, bundle=ModelBundle(
+        version="export", path=artifact_dir, feature_schema=feature_schema,
+        models={"scaler": scaler, "kmeans": outputs["kmeans"], "gmm": gmm}
+    ))
+
+    with open(artifact_dir / "metrics.json", "w") as f:
+        json.dump(outputs["evaluate"], f, indent=4)
+
+    return artifact_dir
+
+
+def save_plots(outputs, out_dir):
+    """Notebook figures (segment scatter, cluster sizes) as PNG files."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    customers = outputs["features"]
+    labels = outputs["kmeans"].labels_
+
+    fig, ax = plt.subplots(figsize=(8, 6))
+    scatter = ax.scatter(customers["Monetary"], customers["Frequency"],
+                         c=labels, cmap="viridis", alpha=0.7, s=8)
+    ax.set_xlabel("Monetary")
+    ax.set_ylabel("Frequency")
+    ax.set_title("Customer Segments (KMeans)")
+    fig.colorbar(scatter, ax=ax, label="KMeans_Cluster")
+    fig.savefig(out_dir / "kmeans_segments.png", dpi=120)
+    plt.close(fig)
+
+    fig, ax = plt.subplots(figsize=(6, 4))
+    sizes = outputs["evaluate"]["kmeans"]["cluster_sizes"]
+    ax.bar(range(len(sizes)), sizes)
+    ax.set_xlabel("KMeans_Cluster")
+    ax.set_ylabel("Customers")
+    fig.savefig(out_dir / "kmeans_cluster_sizes.png", dpi=120)
+    plt.close(fig)
@@ -0,0 +1,147 @@
+"""
+Choice of the number of KMeans clusters (notebook section 7.1).
+
+select_k fits every candidate K in parallel and scores it with inertia
+(elbow), a sampled silhouette and the cheaper Calinski-Harabasz and
+Davies-Bouldin indices. Fitted models (and their scores) are cached on
+disk by (data hash, k, seed), so re-running a sweep on the same data is
+close to free.
+"""
+import hashlib
+import json
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.cluster import KMeans
+from sklearn.metrics import (
+    calinski_harabasz_score,
+    davies_bouldin_score,
+    silhouette_score
+)
+
+RANDOM_STATE = 53
+
+METRICS = ["inertia", "silhouette", "calinski_harabasz", "davies_bouldin"]
+
+
+def data_hash(X) -> str:
+    """Content hash of a feature matrix, used as a cache key."""
+    X = np.ascontiguousarray(X, dtype=np.float64)
+    digest = hashlib.sha1(str(X.shape).encode())
+    digest.update(X.tobytes())
+    return digest.hexdigest()[:16]
+
+
+def fit_kmeans_cached(X, k: int, random_state: int = RANDOM_STATE,
+                      cache_dir=None, key: str = None):
+    """Fit KMeans(k), or load it from cache_dir if this fit was done before."""
+    path = None
+    if cache_dir is not None:
+        key = key or data_hash(X)
+        path = Path(cache_dir) / f"kmeans-{key}-k{k}-seed{random_state}.joblib"
+        if path.exists():
+            return joblib.load(path)
+
+    model = KMeans(n_clusters=k, random_state=random_state).fit(X)
+
+    if path is not None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        joblib.dump(model, path)
+    return model
+
+
+def score_clustering(X, labels, metrics=METRICS, inertia: float = None,
+                     silhouette_sample_size: int = 10_000,
+                     random_state: int = RANDOM_STATE) -> dict:
+    """
+    Cluster quality scores for one labelling.
+
+    The silhouette is O(n^2), so it is computed on silhouette_sample_size
+    rows (None = exact on all rows).
+    """
+    scores = {}
+    if "inertia" in metrics:
+        scores["inertia"] = inertia
+    if "silhouette" in metrics:
+        sample_size = silhouette_sample_size
+        if sample_size is not None and sample_size >= len(X):
+            sample_size = None
+        scores["silhouette"] = float(silhouette_score(
+            X, labels, sample_size=sample_size, random_state=random_state
+        ))
+    if "calinski_harabasz" in metrics:
+        scores["calinski_harabasz"] = float(calinski_harabasz_score(X, labels))
+    if "davies_bouldin" in metrics:
+        scores["davies_bouldin"] = float(davies_bouldin_score(X, labels))
+    return scores
+
+
+def _evaluate_k(X, k, random_state, metrics, silhouette_sample_size,
+                cache_dir, key):
+    model = fit_kmeans_cached(X, k, random_state, cache_dir, key)
+
+    scores_path = None
+    if cache_dir is not None:
+        scores_path = (
+            Path(cache_dir)
+            / f"scores-{key}-k{k}-seed{random_state}"
+              f"-sil{silhouette_sample_size}.json"
+        )
+        if scores_path.exists():
+            cached = json.loads(scores_path.read_text())
+            if set(metrics) <= set(cached):
+                return model, {m: cached[m] for m in metrics}
+
+    scores = score_clustering(
+        X, model.labels_, metrics, float(model.inertia_),
+        silhouette_sample_size, random_state
+    )
+
+    if scores_path is not None:
+        scores_path.write_text(json.dumps(scores))
+    return model, scores
+
+
+def select_k(X, k_values=range(2, 11), random_state: int = RANDOM_STATE,
+             metrics=METRICS, silhouette_sample_size: int = 10_000,
+             n_jobs: int = -1, cache_dir=None):
+    """
+    Fit and score KMeans for every k in k_values.
+
+    Returns (scores, models): a DataFrame of the requested metrics indexed
+    by k, and a dict of the fitted models by k. With cache_dir set, fitted
+    models are reused across runs.
+    """
+    unknown = set(metrics) - set(METRICS)
+    if unknown:
+        raise ValueError(f"Unknown metrics: {sorted(unknown)}")
+
+    X = np.asarray(X, dtype=np.float64)
+    key = data_hash(X) if cache_dir is not None else None
+    k_values = list(k_values)
+
+    results = Parallel(n_jobs=n_jobs)(
+        delayed(_evaluate_k)(X, k, random_state, list(metrics),
+                             silhouette_sample_size, cache_dir, key)
+        for k in k_values
+    )
+
+    models = {k: model for k, (model, _) in zip(k_values, results)}
+    scores = pd.DataFrame(
+        [scores for _, scores in results],
+        index=pd.Index(k_values, name="k"),
+        columns=list(metrics)
+    )
+    return scores, models
+
+
+def best_k(scores, metric: str = "silhouette") -> int:
+    """k with the best value of metric (lowest for Davies-Bouldin)."""
+    if metric == "inertia":
+        raise ValueError("Inertia always falls with k; read the elbow instead")
+    if metric == "davies_bouldin":
+        return int(scores[metric].idxmin())
+    return int(scores[metric].idxmax())